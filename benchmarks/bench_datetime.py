@@ -0,0 +1,54 @@
+"""
+  Created on Oct 18 2026
+
+  Datetime parsing: `dateutil.parser.parse` (the previous parsing of the DateTime, DateField and
+  TimeField fields) against the `utils.parse_*_string` fast paths, and building tzinfo objects
+  on every call (the previous `utils.get_tzinfo`) against the cached ones.
+"""
+import timeit
+
+import pytz
+from dateutil import parser as dt_parser
+
+from cherrypyrest import utils
+
+
+NUMBER = 20000
+
+STRINGS = [
+    ('iso utc', '2026-10-18T10:15:30.123Z'),
+    ('iso offset', '2026-10-18T10:15:30+05:30'),
+    ('date', '2026-10-18'),
+    ('epoch millis', '1792318530123'),
+    ('other format', 'Oct 18 2026 10:15'),
+]
+
+
+def legacy_get_tzinfo(offset):
+  try:
+    return pytz.FixedOffset(float(offset) * 60)
+  except Exception:
+    return pytz.timezone(offset)
+
+
+def micros(func, *args):
+  return min(timeit.repeat(lambda: func(*args), number=NUMBER, repeat=3)) / NUMBER * 1e6
+
+
+def main():
+  print('{:<14} {:>12} {:>12}'.format('string', 'dateutil us', 'utils us'))
+  for name, string in STRINGS:
+    # dateutil raises OverflowError on epoch millis strings
+    before = micros(dt_parser.parse, string) if name != 'epoch millis' else float('nan')
+    print('{:<14} {:>12.2f} {:>12.2f}'.format(name, before, micros(utils.parse_datetime_string, string)))
+  print('{:<14} {:>12.2f} {:>12.2f}'.format(
+      'time', micros(dt_parser.parse, '10:15:30'), micros(utils.parse_time_string, '10:15:30')))
+  print('')
+  print('{:<14} {:>12} {:>12}'.format('tzinfo', 'built us', 'cached us'))
+  for offset in ('5.5', 'Asia/Kolkata'):
+    print('{:<14} {:>12.2f} {:>12.2f}'.format(
+        offset, micros(legacy_get_tzinfo, offset), micros(utils.get_tzinfo, offset)))
+
+
+if __name__ == '__main__':
+  main()
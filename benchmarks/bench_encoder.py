@@ -0,0 +1,60 @@
+"""
+  Created on Oct 18 2026
+
+  Response encoding: `utils.format_response` followed by json (the previous `GenericAPI.default`,
+  which also copied the response) against the single pass `encoders.dumps`.
+"""
+import copy
+import datetime
+import json
+import time
+
+import pytz
+from bson.objectid import ObjectId
+
+from cherrypyrest import encoders
+from cherrypyrest import utils
+
+
+RUNS = 20
+
+
+def nested(depth, width=3):
+  node = {
+      '_id': ObjectId(),
+      'name': 'node',
+      'created_at': datetime.datetime(2026, 10, 18, 10, 0, tzinfo=pytz.utc),
+      'tags': ['a', 'b', 'c'],
+      'refs': [ObjectId() for _ in range(width)],
+  }
+  if depth:
+    node['children'] = [nested(depth - 1, width) for _ in range(width)]
+  return node
+
+
+def legacy_encode(envelope):
+  envelope = copy.deepcopy(envelope)
+  utils.format_response(envelope['data'])
+  return json.dumps(envelope).encode('utf-8')
+
+
+def seconds(func, envelope):
+  started = time.perf_counter()
+  for _ in range(RUNS):
+    func(envelope)
+  return time.perf_counter() - started
+
+
+def main():
+  print('{} encodes per run'.format(RUNS))
+  print('{:>6} {:>8} {:>22} {:>16}'.format('depth', 'nodes', 'format_response+json', 'encoders.dumps'))
+  for depth in (1, 2, 3, 4):
+    envelope = {'success': True, 'message': 'success', 'data': [nested(depth) for _ in range(10)]}
+    assert json.loads(legacy_encode(envelope)) == json.loads(encoders.dumps(envelope))
+    nodes = 10 * sum(3 ** level for level in range(depth + 1))
+    print('{:>6} {:>8} {:>21.3f}s {:>15.3f}s'.format(
+        depth, nodes, seconds(legacy_encode, envelope), seconds(encoders.dumps, envelope)))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,70 @@
+"""
+  Created on Oct 18 2026
+
+  Cost of a POST request through `GenericAPI.default` whose handler raises a 400 validation
+  error, against one which succeeds. The script only uses the api entry points, so it can be
+  run on older checkouts of the package for the cost of the previous error path.
+"""
+import contextlib
+import io
+import sys
+import time
+
+import cherrypy
+from cherrypy import _cprequest
+from cherrypy.lib import httputil
+
+from cherrypyrest import messages
+from cherrypyrest import rest_apis
+from cherrypyrest.exceptions import APIException
+
+
+NUMBER = 5000
+BODY = b'{"email": "bad"}'
+
+
+class Service(object):
+  pass
+
+
+class InvalidAPI(rest_apis.CreateAPI):
+  service = Service
+
+  def perform_create(self, data):
+    raise Exception(400, messages.VALIDATION_ERROR, {'email': messages.INVALID_EMAIL})
+
+
+class ValidAPI(rest_apis.CreateAPI):
+  service = Service
+
+  def perform_create(self, data):
+    return {'email': 'a@b.c'}
+
+
+def micros(api):
+  request = _cprequest.Request(httputil.Host('127.0.0.1', 80), httputil.Host('127.0.0.1', 1111))
+  request.method = 'POST'
+  request.path_info = '/users'
+  cherrypy.serving.load(request, _cprequest.Response())
+  started = time.perf_counter()
+  for _ in range(NUMBER):
+    request.headers = httputil.HeaderMap({'Content-Length': str(len(BODY))})
+    request.body = io.BytesIO(BODY)
+    try:
+      api.default()
+    except APIException as ex:
+      ex.set_response()
+  return (time.perf_counter() - started) / NUMBER * 1e6
+
+
+def main():
+  # previous versions printed the traceback of every error to stdout
+  with contextlib.redirect_stdout(io.StringIO()):
+    invalid = micros(InvalidAPI())
+    valid = micros(ValidAPI())
+  sys.stdout.write('invalid payload: {:.1f} us/request\n'.format(invalid))
+  sys.stdout.write('valid payload:   {:.1f} us/request\n'.format(valid))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,66 @@
+"""
+  Created on Oct 18 2026
+
+  Attribute reads on populated model objects: the previous `Model.__getattribute__` override,
+  reproduced on a subclass, against the `LazyField` descriptors and plain objects.
+"""
+import timeit
+
+from bson.objectid import ObjectId
+
+from cherrypyrest import fields as base_fields
+from cherrypyrest import models
+
+
+NUMBER = 200000
+
+
+class User(models.Model):
+  fields = ['_id', 'name', 'email', 'age']
+  pk = base_fields.ObjectID()
+  name = base_fields.String()
+  email = base_fields.Email()
+  age = base_fields.Number()
+
+  def label(self):
+    return self.name
+
+
+class LegacyUser(User):
+
+  def __getattribute__(self, attr):
+    value = object.__getattribute__(self, attr)
+    if attr not in object.__getattribute__(self, 'db_fields'):
+      return value
+    if not isinstance(value, base_fields.Empty):
+      return value
+    raise AssertionError('the benchmark only reads populated fields')
+
+
+class Plain(object):
+
+  def __init__(self, **kwargs):
+    self.__dict__.update(kwargs)
+
+  def label(self):
+    return self.name
+
+
+def read(obj):
+  return obj.name, obj.email, obj.age, obj.label
+
+
+def main():
+  data = {'_id': ObjectId(), 'name': 'a', 'email': 'a@x.io', 'age': 30}
+  objs = [('legacy __getattribute__', LegacyUser()), ('LazyField', User()),
+          ('plain object', Plain(**data))]
+  print('{} reads of three fields and a method'.format(NUMBER))
+  for name, obj in objs:
+    if isinstance(obj, models.Model):
+      obj.set_value(data)
+    seconds = min(timeit.repeat(lambda: read(obj), number=NUMBER, repeat=3))
+    print('{:<24} {:>6.3f}s'.format(name, seconds))
+
+
+if __name__ == '__main__':
+  main()
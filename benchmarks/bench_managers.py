@@ -0,0 +1,82 @@
+"""
+  Created on Oct 18 2026
+
+  Manager method calls: the previous `BaseManager.__getattribute__`, which looked the name up in
+  the shared `_manager_methods` list and built a new wrapper on every call (reproduced below),
+  against the methods wrapped once per class by `ManagerMeta`.
+"""
+import timeit
+
+import cherrypy
+from cherrypy import _cprequest
+from cherrypy.lib import httputil
+
+from cherrypyrest import managers
+from cherrypyrest.utils import unicode_to_str_wrapper
+
+
+NUMBER = 200000
+# the previous `_manager_methods` list grew with every manager instantiation, ex: one per request
+INSTANCES = 1000
+
+
+class LegacyManager(object):
+  _excluded_attrs_from_wrapper = ['db', 'collection', 'client']
+  _manager_methods = []
+
+  def __init__(self):
+    self._manager_methods = self.__class__._manager_methods
+    for key in list(self.__class__.__dict__.keys()):
+      if key.startswith('_') or key in self._excluded_attrs_from_wrapper:
+        continue
+      if not callable(object.__getattribute__(self, key)):
+        continue
+      self._manager_methods.append(key)
+
+  def __getattribute__(self, attr_name):
+    attribute = object.__getattribute__(self, attr_name)
+    if attr_name not in object.__getattribute__(self, '_manager_methods'):
+      return attribute
+    return unicode_to_str_wrapper(attribute)
+
+
+class LegacyUserManager(LegacyManager):
+
+  def find_user(self, pk):
+    return {'_id': pk, 'name': 'a', 'roles': ['admin']}
+
+  def count(self):
+    return 1
+
+
+class UserManager(managers.BaseManager):
+
+  def find_user(self, pk):
+    return {'_id': pk, 'name': 'a', 'roles': ['admin']}
+
+  @managers.raw_result
+  def count(self):
+    return 1
+
+
+def load_request(app):
+  request = _cprequest.Request(httputil.Host('127.0.0.1', 80), httputil.Host('127.0.0.1', 1111))
+  request.app = app
+  cherrypy.serving.load(request, _cprequest.Response())
+
+
+def main():
+  for _ in range(INSTANCES):
+    LegacyUserManager()
+  print('{} calls, legacy method list grown by {} instantiations'.format(NUMBER, INSTANCES))
+  # outside of a request ManagerMeta methods go through `pool.run_operation`
+  for where, app in (('request', cherrypy.Application(None)), ('no request', None)):
+    load_request(app)
+    for name, manager in (('legacy', LegacyUserManager()), ('ManagerMeta', UserManager())):
+      for method, args in (('find_user', (1,)), ('count', ())):
+        seconds = min(timeit.repeat(
+            lambda: getattr(manager, method)(*args), number=NUMBER, repeat=3))
+        print('{:<11} {:<12} {:<10} {:>6.3f}s'.format(where, name, method, seconds))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,84 @@
+"""
+  Created on Oct 18 2026
+
+  Memory and time of validating a list of rows into model objects (`Model.set_value`) against
+  slotted records (`Model.load_records`).
+"""
+import datetime
+import gc
+import time
+import tracemalloc
+
+import pytz
+from bson.objectid import ObjectId
+
+from cherrypyrest import fields as base_fields
+from cherrypyrest import models
+
+
+ROWS = 10000
+
+
+class Venue(models.Model):
+  fields = ['_id', 'name', 'city']
+  pk = base_fields.ObjectID()
+  name = base_fields.String()
+  city = base_fields.String()
+
+
+class Event(models.Model):
+  fields = ['_id', 'name', 'starts_at', 'seats', 'venue']
+  pk = base_fields.ObjectID()
+  name = base_fields.String()
+  starts_at = base_fields.DateTime()
+  seats = base_fields.Number()
+  venue = base_fields.RelatedField(child=Venue())
+
+
+def rows():
+  starts_at = datetime.datetime(2026, 10, 18, 10, 0, tzinfo=pytz.utc)
+  return [{
+      '_id': ObjectId(),
+      'name': 'event {}'.format(index),
+      'starts_at': starts_at,
+      'seats': index,
+      'venue': {'_id': ObjectId(), 'name': 'venue', 'city': 'city'},
+  } for index in range(ROWS)]
+
+
+def load_models(data):
+  objs = []
+  for row in data:
+    obj = Event()
+    obj.set_value(row, validate=True)
+    objs.append(obj)
+  return objs
+
+
+def measure(func, data):
+  gc.collect()
+  tracemalloc.start()
+  started = time.perf_counter()
+  result = func(data)
+  elapsed = time.perf_counter() - started
+  size = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+  assert len(result) == len(data)
+  return size, elapsed
+
+
+def main():
+  data = rows()
+  assert load_models(data[:1])[0].serialize() == Event.load_records(data[:1])[0].serialize()
+  print('{} rows, traced memory held by the result and time (tracemalloc slows both)'.format(ROWS))
+  for name, func in (('models', load_models), ('records', Event.load_records)):
+    size, elapsed = min(measure(func, data) for _ in range(3))
+    print('{:<8} {:>8.2f}MB {:>8.2f}s'.format(name, size / 1e6, elapsed))
+  for name, func in (('models', load_models), ('records', Event.load_records)):
+    started = time.perf_counter()
+    func(data)
+    print('{:<8} {:>8.2f}s without tracemalloc'.format(name, time.perf_counter() - started))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,68 @@
+"""
+  Created on Oct 18 2026
+
+  Dispatch latency against the number of routes: matching a `utils.url` table in order, one
+  regex at a time, against `routers.Router`.
+"""
+import random
+import time
+
+from cherrypyrest import utils
+from cherrypyrest.routers import Router
+
+
+LOOKUPS = 2000
+
+
+def linear_match(urls, path):
+  for regex, api, kwargs in urls:
+    match = regex.match(path)
+    if match:
+      route_kwargs = dict(kwargs)
+      route_kwargs.update(match.groupdict())
+      named = set(regex.groupindex.values())
+      args = tuple(group for index, group in enumerate(match.groups(), 1) if index not in named)
+      return api, args, route_kwargs
+
+
+def url_table(resources):
+  urls = []
+  for index in range(resources):
+    urls.append(utils.url(r'^apis/res%d/$' % index, 'list%d' % index))
+    urls.append(utils.url(r'^apis/res%d/(?P<pk>[0-9a-f]+)/$' % index, 'detail%d' % index, {'x': index}))
+    urls.append(utils.url(r'^apis/res%d/([0-9a-f]+)/sub/(\w+)/$' % index, 'sub%d' % index))
+  urls.append(utils.url(r'^apis/(\w+)/same/\1/$', 'backref'))
+  urls.append(utils.url(r'(?i)^APIS/upper/$', 'flags'))
+  urls.append(utils.url(r'^apis/(?P<a>\w+)/(?P=a)/$', 'named_backref'))
+  return urls
+
+
+def micros(func, paths):
+  started = time.perf_counter()
+  for path in paths:
+    func(path)
+  return (time.perf_counter() - started) / len(paths) * 1e6
+
+
+def main():
+  rand = random.Random(1)
+  urls = url_table(50)
+  router = Router(urls)
+  paths = ['apis/res{}/{}'.format(index, suffix) for index in range(50)
+           for suffix in ('', 'ab12/', 'ff/sub/z_1/')]
+  paths += ['apis/q/same/q/', 'apis/upper/', 'apis/k/k/', 'nope/', 'apis/res1/zz/']
+  for path in paths:
+    assert router.match(path) == linear_match(urls, path), path
+  print('router matches the linear scan on {} paths'.format(len(paths)))
+  print('{:>6} {:>12} {:>12}'.format('routes', 'linear us', 'router us'))
+  for resources in (3, 33, 100, 333):
+    urls = url_table(resources)
+    router = Router(urls)
+    paths = ['apis/res{}/{}'.format(rand.randrange(resources), rand.choice(['', 'ab/', 'ab/sub/x/']))
+             for _ in range(LOOKUPS)]
+    print('{:>6} {:>12.1f} {:>12.1f}'.format(
+        len(urls), micros(lambda path: linear_match(urls, path), paths), micros(router.match, paths)))
+
+
+if __name__ == '__main__':
+  main()
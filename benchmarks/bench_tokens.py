@@ -0,0 +1,53 @@
+"""
+  Created on Oct 18 2026
+
+  ObjectId token encoding: a new AES cipher per value (the previous `utils.encode`) against the
+  codec with its per thread cipher, its memo and `encode_many`.
+"""
+import base64
+import binascii
+import time
+
+from bson.objectid import ObjectId
+from Crypto.Cipher import AES
+
+from cherrypyrest import utils
+
+
+IDS = 20000
+
+
+def legacy_encode(value):
+  cipher = AES.new(utils.to_bytes(utils.SECRET), AES.MODE_ECB)
+  encrypted = cipher.encrypt(utils.to_bytes(value.rjust(32)))
+  return str(binascii.hexlify(base64.b64encode(encrypted)), 'utf-8')
+
+
+def rate(func, values):
+  started = time.perf_counter()
+  func(values)
+  return len(values) / (time.perf_counter() - started)
+
+
+def main():
+  utils.get_cipher_instance()
+  values = [str(ObjectId()) for _ in range(IDS)]
+  assert [legacy_encode(value) for value in values[:10]] == utils.encode_many(values[:10])
+  rows = [
+      ('cipher per value', lambda values: [legacy_encode(value) for value in values]),
+      ('utils.encode', lambda values: [utils.encode(value) for value in values]),
+      ('utils.encode_many', utils.encode_many),
+  ]
+  print('{} fresh ids per run'.format(IDS))
+  for name, func in rows:
+    # fresh ids so the memo of the codec does not serve them
+    values = [str(ObjectId()) for _ in range(IDS)]
+    print('{:<20} {:>10,.0f} tokens/s'.format(name, rate(func, values)))
+  tokens = utils.encode_many(values)
+  print('{:<20} {:>10,.0f} tokens/s'.format('utils.encode (memo)', rate(
+      lambda values: [utils.encode(value) for value in values], values[-4096:])))
+  print('{:<20} {:>10,.0f} tokens/s'.format('utils.decode_many', rate(utils.decode_many, tokens)))
+
+
+if __name__ == '__main__':
+  main()
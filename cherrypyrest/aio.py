@@ -0,0 +1,245 @@
+"""
+  Created on Oct 18 2026
+
+  asyncio support (python 3 only). Coroutines run on one event loop thread shared by the
+  process and cherrypy worker threads wait for their results, so async handlers, permissions
+  and managers can run their I/O concurrently (ex: with asyncio.gather) on shared async clients.
+"""
+import asyncio
+import functools
+import inspect
+import os
+import threading
+
+import cherrypy
+
+from . import backends
+from .context import _current_context
+from .rest_apis import GenericAPI
+
+
+class EventLoopThread(object):
+  """
+    Event loop running in a daemon thread, started on first use (again in a forked child)
+    and stopped with the cherrypy engine.
+  """
+
+  def __init__(self):
+    self._loop = None
+    self._thread = None
+    self._pid = None
+    self._lock = threading.Lock()
+
+  @property
+  def loop(self):
+    if self._loop is None or self._pid != os.getpid():
+      with self._lock:
+        if self._loop is None or self._pid != os.getpid():
+          self._start()
+    return self._loop
+
+  def _start(self):
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=self._run, args=(loop,), name='cherrypyrest-event-loop')
+    thread.daemon = True
+    thread.start()
+    self._loop, self._thread, self._pid = loop, thread, os.getpid()
+    cherrypy.engine.subscribe('stop', self.stop)
+
+  @staticmethod
+  def _run(loop):
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+  def run(self, coro, timeout=None):
+    """
+      Runs the coroutine on the loop and returns its result, exceptions are raised in the
+      calling thread.
+    """
+    loop = self.loop
+    if threading.current_thread() is self._thread:
+      raise RuntimeError('run() called from the event loop thread, await the coroutine instead')
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+  def stop(self):
+    with self._lock:
+      loop, thread = self._loop, self._thread
+      self._loop = self._thread = None
+    if loop is not None and self._pid == os.getpid():
+      cherrypy.engine.unsubscribe('stop', self.stop)
+      loop.call_soon_threadsafe(loop.stop)
+      thread.join()
+      loop.close()
+
+
+EVENT_LOOP = EventLoopThread()
+
+
+def run_coroutine(coro, timeout=None):
+  return EVENT_LOOP.run(coro, timeout)
+
+
+async def bind_context(coro, context):
+  """
+    Runs the coroutine with the given request context, the task running it on the loop has
+    its own copy of the context variables.
+  """
+  _current_context.set(context)
+  return await coro
+
+
+class AsyncGenericAPI(GenericAPI):
+  """
+    GenericAPI whose verb handlers (GET, POST, ..., get_queryset, perform_create, ...) and
+    permission `has_permission` methods may be coroutines, ex:
+
+      class UserAPI(AsyncGenericAPI, RetrieveAPI):
+        async def GET(self, *args, **kwargs):
+          return await self.manager.get_obj(self.pk)
+
+    Request parsing and sync permissions run in the cherrypy worker thread, coroutines run on
+    the shared event loop where `cherrypy.request` is not the current request: use the
+    request context (`self.context`, `self.request`, `self.pk`, ...) instead.
+  """
+
+  def run(self, coro):
+    return run_coroutine(bind_context(coro, self.context))
+
+  def check_permissions(self, *args, **kwargs):
+    for permission in self.permissions:
+      result = permission(self, *args, **kwargs).has_permission()
+      if inspect.isawaitable(result):
+        self.run(result)
+
+  def call_handler(self, method, *args, **kwargs):
+    resp = super(AsyncGenericAPI, self).call_handler(method, *args, **kwargs)
+    if inspect.isawaitable(resp):
+      resp = self.run(resp)
+    return resp
+
+  def build_page(self, items, sort, limit):
+    # keyset pagination of a `ListAPI`: `get_page` or `manager.find_page` may be coroutines
+    if inspect.isawaitable(items):
+      items = self.run(items)
+    return super(AsyncGenericAPI, self).build_page(items, sort, limit)
+
+
+class AsyncBaseManager(object):
+  """
+    Async counterpart of `managers.BaseManager` for async mongo drivers (ex: motor) or
+    `AsyncMemoryBackend`. `backend.get_collection(name)` must return a collection with
+    coroutine methods.
+  """
+  collection_name = None
+  backend = None
+
+  @property
+  def collection(self):
+    return self.backend.get_collection(self.collection_name)
+
+  async def get_obj(self, pk):
+    return await self.collection.find_one({'_id': pk})
+
+  async def get_objs(self, pks):
+    return await self.collection.find({'_id': {'$in': list(pks)}}).to_list(None)
+
+  async def find_page(self, query, sort, limit, projection=None):
+    return await self.collection.find(query, projection).sort(sort).limit(limit).to_list(None)
+
+  async def insert(self, document):
+    return (await self.collection.insert_one(document)).inserted_id
+
+  async def update_fields(self, pk, update):
+    return await self.collection.update_one({'_id': pk}, update)
+
+  async def delete(self, pk):
+    return await self.collection.delete_one({'_id': pk})
+
+
+class SyncManagerAdapter(object):
+  """
+    Exposes the methods of a blocking manager as coroutines running in the default executor
+    of the loop, so existing managers can be awaited from async handlers.
+  """
+
+  def __init__(self, manager):
+    self.manager = manager
+
+  def __getattr__(self, name):
+    func = getattr(self.manager, name)
+    if not callable(func):
+      return func
+
+    async def call(*args, **kwargs):
+      loop = asyncio.get_event_loop()
+      return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+    return call
+
+
+class AsyncMemoryCursor(object):
+
+  def __init__(self, cursor, latency):
+    self._cursor = cursor
+    self._latency = latency
+
+  def sort(self, key_or_list, direction=1):
+    self._cursor.sort(key_or_list, direction)
+    return self
+
+  def skip(self, skip):
+    self._cursor.skip(skip)
+    return self
+
+  def limit(self, limit):
+    self._cursor.limit(limit)
+    return self
+
+  async def to_list(self, length=None):
+    await asyncio.sleep(self._latency)
+    documents = list(self._cursor)
+    return documents[:length] if length else documents
+
+  def __aiter__(self):
+    return self._iterate()
+
+  async def _iterate(self):
+    for document in await self.to_list():
+      yield document
+
+
+class AsyncMemoryCollection(object):
+  """
+    Coroutine version of `backends.MemoryCollection`, every call waits `latency` seconds to
+    simulate the round trip to the database.
+  """
+
+  def __init__(self, collection, latency):
+    self._collection = collection
+    self._latency = latency
+
+  def find(self, filter=None, projection=None, **kwargs):
+    return AsyncMemoryCursor(self._collection.find(filter, projection, **kwargs), self._latency)
+
+  def __getattr__(self, name):
+    func = getattr(self._collection, name)
+
+    async def call(*args, **kwargs):
+      await asyncio.sleep(self._latency)
+      return func(*args, **kwargs)
+    return call
+
+
+class AsyncMemoryBackend(backends.Backend):
+  """
+    In process fake async backend for local tests and load tests of async apis.
+  """
+
+  def __init__(self, latency=0, indexes=None):
+    self.latency = latency
+    self.backend = backends.MemoryBackend(indexes)
+
+  def get_collection(self, name):
+    return AsyncMemoryCollection(self.backend.get_collection(name), self.latency)
+
+  def drop(self):
+    self.backend.drop()
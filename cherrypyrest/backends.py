@@ -0,0 +1,458 @@
+"""
+  Created on Oct 18 2026
+"""
+from builtins import object
+from collections import defaultdict
+import copy
+import threading
+
+from bson.objectid import ObjectId
+
+
+class Backend(object):
+  """
+    Storage used by managers. `BaseManager.collection` asks the backend for a collection by
+    name, so a backend only has to return objects with the pymongo collection methods
+    the managers use.
+  """
+
+  def get_collection(self, name):
+    raise NotImplementedError()
+
+
+class MongoBackend(Backend):
+  """
+    Collections of a mongo database. Clients are borrowed from the given client pool,
+    ex: MongoBackend(DATABASE_NAME, managers.CLIENT_POOL)
+  """
+
+  def __init__(self, database_name, pool):
+    self.database_name = database_name
+    self.pool = pool
+
+  def get_collection(self, name):
+    return self.pool.acquire()[self.database_name].get_collection(name)
+
+
+class InsertOneResult(object):
+
+  def __init__(self, inserted_id):
+    self.inserted_id = inserted_id
+    self.acknowledged = True
+
+
+class InsertManyResult(object):
+
+  def __init__(self, inserted_ids):
+    self.inserted_ids = inserted_ids
+    self.acknowledged = True
+
+
+class UpdateResult(object):
+
+  def __init__(self, matched_count, modified_count, upserted_id=None):
+    self.matched_count = matched_count
+    self.modified_count = modified_count
+    self.upserted_id = upserted_id
+    self.acknowledged = True
+
+
+class DeleteResult(object):
+
+  def __init__(self, deleted_count):
+    self.deleted_count = deleted_count
+    self.acknowledged = True
+
+
+class BulkWriteResult(object):
+
+  def __init__(self):
+    self.inserted_count = 0
+    self.matched_count = 0
+    self.modified_count = 0
+    self.deleted_count = 0
+    self.upserted_count = 0
+    self.upserted_ids = dict()
+    self.acknowledged = True
+
+
+_MISSING = object()
+
+
+def _get_value(doc, key):
+  value = doc
+  for part in key.split('.'):
+    if not isinstance(value, dict) or part not in value:
+      return _MISSING
+    value = value[part]
+  return value
+
+
+def _compare(value, operator, expected):
+  if operator == '$in':
+    return value in expected
+  if operator == '$nin':
+    return value not in expected
+  if operator == '$ne':
+    return (None if value is _MISSING else value) != expected
+  if operator == '$exists':
+    return (value is not _MISSING) == bool(expected)
+  if value is _MISSING or value is None:
+    return False
+  if operator == '$gt':
+    return value > expected
+  if operator == '$gte':
+    return value >= expected
+  if operator == '$lt':
+    return value < expected
+  if operator == '$lte':
+    return value <= expected
+  raise ValueError('Unsupported query operator \'{}\''.format(operator))
+
+
+def matches(doc, query):
+  """
+    Evaluates the subset of the mongo query language supported by `MemoryCollection`:
+    equality, `$in`, `$nin`, `$ne`, `$gt`, `$gte`, `$lt`, `$lte`, `$exists`, `$and` and `$or`.
+  """
+  for key, expected in list(query.items()):
+    if key == '$and':
+      if not all(matches(doc, sub_query) for sub_query in expected):
+        return False
+      continue
+    if key == '$or':
+      if not any(matches(doc, sub_query) for sub_query in expected):
+        return False
+      continue
+    value = _get_value(doc, key)
+    if isinstance(expected, dict) and expected and all(k.startswith('$') for k in expected):
+      for operator, operand in list(expected.items()):
+        if value is not _MISSING and isinstance(value, list) and operator in ('$in', '$nin'):
+          found = any(item in operand for item in value)
+          if found != (operator == '$in'):
+            return False
+          continue
+        if not _compare(None if value is _MISSING and operator in ('$in', '$nin') else value,
+                        operator, operand):
+          return False
+      continue
+    if value is _MISSING:
+      if expected is not None:
+        return False
+      continue
+    if value != expected and not (isinstance(value, list) and expected in value):
+      return False
+  return True
+
+
+def _sort_key(key):
+  def get(doc):
+    value = _get_value(doc, key)
+    if value is _MISSING or value is None:
+      return (0, 0)
+    return (1, value)
+  return get
+
+
+def project(doc, projection):
+  if not projection:
+    return copy.deepcopy(doc)
+  if isinstance(projection, (list, tuple)):
+    projection = dict((key, 1) for key in projection)
+  include = [key for key, value in list(projection.items()) if value and key != '_id']
+  if include:
+    result = dict((key, copy.deepcopy(doc[key])) for key in include if key in doc)
+    if projection.get('_id', 1) and '_id' in doc:
+      result['_id'] = doc['_id']
+    return result
+  return dict((key, copy.deepcopy(value)) for key, value in list(doc.items())
+              if projection.get(key, 1))
+
+
+class MemoryCursor(object):
+
+  def __init__(self, documents, projection=None):
+    self._documents = documents
+    self._projection = projection
+    self._sort = []
+    self._skip = 0
+    self._limit = 0
+
+  def sort(self, key_or_list, direction=1):
+    if isinstance(key_or_list, (list, tuple)):
+      self._sort = list(key_or_list)
+    else:
+      self._sort = [(key_or_list, direction)]
+    return self
+
+  def skip(self, skip):
+    self._skip = skip
+    return self
+
+  def limit(self, limit):
+    self._limit = limit
+    return self
+
+  def _results(self):
+    documents = self._documents
+    # stable sorts applied from the least to the most significant key
+    for key, direction in reversed(self._sort):
+      documents = sorted(documents, key=_sort_key(key), reverse=direction < 0)
+    documents = documents[self._skip:]
+    if self._limit:
+      documents = documents[:self._limit]
+    return documents
+
+  def __iter__(self):
+    for doc in self._results():
+      yield project(doc, self._projection)
+
+  def count(self):
+    return len(self._results())
+
+
+class MemoryCollection(object):
+  """
+    In process collection keeping the documents in a dict keyed by `_id`, with secondary
+    indexes (value -> ids) on the declared fields. Queries on `_id` or on an indexed field
+    (equality or `$in`) only look at the matching documents, everything else is a scan.
+    Documents are deep copied on the way in and out, so in place changes to a returned
+    document (or to one being inserted) never reach the stored data without a write.
+  """
+
+  def __init__(self, name, indexes=()):
+    self.name = name
+    self._documents = dict()
+    self._indexes = dict((field, defaultdict(set)) for field in indexes)
+    self._lock = threading.RLock()
+
+  def create_index(self, field, **kwargs):
+    if isinstance(field, (list, tuple)):
+      field = field[0][0] if isinstance(field[0], (list, tuple)) else field[0]
+    with self._lock:
+      if field not in self._indexes:
+        index = self._indexes[field] = defaultdict(set)
+        for _id, doc in list(self._documents.items()):
+          self._index_value(index, _get_value(doc, field), _id)
+    return field
+
+  @staticmethod
+  def _index_value(index, value, _id):
+    try:
+      index[value].add(_id)
+    except TypeError:
+      # unhashable values (ex: lists) can't be indexed, they are always checked by the query
+      index[_MISSING].add(_id)
+
+  def _add_to_indexes(self, doc):
+    for field, index in list(self._indexes.items()):
+      self._index_value(index, _get_value(doc, field), doc['_id'])
+
+  def _remove_from_indexes(self, doc):
+    for field, index in list(self._indexes.items()):
+      key = _get_value(doc, field)
+      try:
+        ids = index.get(key)
+      except TypeError:
+        key = _MISSING
+        ids = index.get(key)
+      if ids is not None:
+        ids.discard(doc['_id'])
+        if not ids:
+          del index[key]
+
+  def _candidate_ids(self, query):
+    for field in ['_id'] + list(self._indexes):
+      if field not in query:
+        continue
+      expected = query[field]
+      if isinstance(expected, dict):
+        if list(expected) != ['$in']:
+          continue
+        values = expected['$in']
+      else:
+        values = [expected]
+      ids = set()
+      try:
+        for value in values:
+          if field == '_id':
+            if value in self._documents:
+              ids.add(value)
+          else:
+            ids.update(self._indexes[field].get(value, ()))
+      except TypeError:
+        continue
+      if field != '_id':
+        ids.update(self._indexes[field].get(_MISSING, ()))
+      return ids
+    return None
+
+  def _find(self, query):
+    query = query or {}
+    ids = self._candidate_ids(query)
+    if ids is None:
+      documents = list(self._documents.values())
+    else:
+      documents = [self._documents[_id] for _id in ids]
+    return [doc for doc in documents if matches(doc, query)]
+
+  def find(self, filter=None, projection=None, **kwargs):
+    with self._lock:
+      cursor = MemoryCursor(self._find(filter), projection)
+    if kwargs.get('sort'):
+      cursor.sort(kwargs['sort'])
+    if kwargs.get('skip'):
+      cursor.skip(kwargs['skip'])
+    if kwargs.get('limit'):
+      cursor.limit(kwargs['limit'])
+    return cursor
+
+  def find_one(self, filter=None, projection=None, **kwargs):
+    if filter is not None and not isinstance(filter, dict):
+      filter = {'_id': filter}
+    for doc in self.find(filter, projection, **kwargs).limit(1):
+      return doc
+    return None
+
+  def count_documents(self, filter, **kwargs):
+    with self._lock:
+      return len(self._find(filter))
+
+  def insert_one(self, document):
+    with self._lock:
+      doc = copy.deepcopy(document)
+      if '_id' not in doc:
+        doc['_id'] = ObjectId()
+      if doc['_id'] in self._documents:
+        raise ValueError('Duplicate key \'{}\' in collection \'{}\''.format(doc['_id'], self.name))
+      document['_id'] = doc['_id']
+      self._documents[doc['_id']] = doc
+      self._add_to_indexes(doc)
+    return InsertOneResult(doc['_id'])
+
+  def insert_many(self, documents, ordered=True):
+    return InsertManyResult([self.insert_one(document).inserted_id for document in documents])
+
+  @staticmethod
+  def _apply_update(doc, update):
+    operators = [key for key in update if key.startswith('$')]
+    if not operators:
+      new_doc = copy.deepcopy(update)
+      new_doc['_id'] = doc['_id']
+      return new_doc
+    new_doc = dict(doc)
+    for operator, values in list(update.items()):
+      if operator == '$set':
+        new_doc.update(copy.deepcopy(values))
+      elif operator == '$unset':
+        for key in values:
+          new_doc.pop(key, None)
+      elif operator == '$inc':
+        for key, value in list(values.items()):
+          new_doc[key] = new_doc.get(key, 0) + value
+      else:
+        raise ValueError('Unsupported update operator \'{}\''.format(operator))
+    return new_doc
+
+  def _update(self, filter, update, many, upsert):
+    with self._lock:
+      documents = self._find(filter)
+      if not many:
+        documents = documents[:1]
+      if not documents and upsert:
+        base = dict((key, value) for key, value in list(filter.items())
+                    if not key.startswith('$') and not isinstance(value, dict))
+        doc = self._apply_update(dict(base, _id=base.get('_id', ObjectId())), update)
+        self.insert_one(doc)
+        return UpdateResult(0, 0, doc['_id'])
+      modified = 0
+      for doc in documents:
+        new_doc = self._apply_update(doc, update)
+        if new_doc != doc:
+          modified += 1
+        self._remove_from_indexes(doc)
+        self._documents[doc['_id']] = new_doc
+        self._add_to_indexes(new_doc)
+      return UpdateResult(len(documents), modified)
+
+  def update_one(self, filter, update, upsert=False, **kwargs):
+    return self._update(filter, update, False, upsert)
+
+  def update_many(self, filter, update, upsert=False, **kwargs):
+    return self._update(filter, update, True, upsert)
+
+  def replace_one(self, filter, replacement, upsert=False, **kwargs):
+    return self._update(filter, dict(replacement), False, upsert)
+
+  def _delete(self, filter, many):
+    with self._lock:
+      documents = self._find(filter)
+      if not many:
+        documents = documents[:1]
+      for doc in documents:
+        self._remove_from_indexes(doc)
+        del self._documents[doc['_id']]
+      return DeleteResult(len(documents))
+
+  def delete_one(self, filter, **kwargs):
+    return self._delete(filter, False)
+
+  def delete_many(self, filter, **kwargs):
+    return self._delete(filter, True)
+
+  def bulk_write(self, requests, ordered=True, **kwargs):
+    """
+      Applies pymongo write operations (InsertOne, UpdateOne, UpdateMany, ReplaceOne,
+      DeleteOne, DeleteMany) in order.
+    """
+    result = BulkWriteResult()
+    with self._lock:
+      for index, request in enumerate(requests):
+        name = request.__class__.__name__
+        if name == 'InsertOne':
+          self.insert_one(request._doc)
+          result.inserted_count += 1
+        elif name in ('UpdateOne', 'UpdateMany', 'ReplaceOne'):
+          update = self._update(request._filter, dict(request._doc), name == 'UpdateMany',
+                                bool(request._upsert))
+          result.matched_count += update.matched_count
+          result.modified_count += update.modified_count
+          if update.upserted_id is not None:
+            result.upserted_count += 1
+            result.upserted_ids[index] = update.upserted_id
+        elif name in ('DeleteOne', 'DeleteMany'):
+          result.deleted_count += self._delete(request._filter, name == 'DeleteMany').deleted_count
+        else:
+          raise ValueError('Unsupported bulk write operation \'{}\''.format(name))
+    return result
+
+  def drop(self):
+    with self._lock:
+      self._documents.clear()
+      for index in list(self._indexes.values()):
+        index.clear()
+
+
+class MemoryBackend(Backend):
+  """
+    Fast in process backend for local load tests and benchmarks.
+    `indexes` maps collection names to the fields indexed in that collection.
+  """
+
+  def __init__(self, indexes=None):
+    self.indexes = indexes or dict()
+    self._collections = dict()
+    self._lock = threading.Lock()
+
+  def get_collection(self, name):
+    collection = self._collections.get(name)
+    if collection is None:
+      with self._lock:
+        collection = self._collections.get(name)
+        if collection is None:
+          collection = self._collections[name] = MemoryCollection(name, self.indexes.get(name, ()))
+    return collection
+
+  def drop(self):
+    with self._lock:
+      self._collections.clear()
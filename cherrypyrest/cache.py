@@ -0,0 +1,211 @@
+"""
+  Created on Oct 18 2026
+"""
+from builtins import object
+from collections import OrderedDict
+import copy
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+
+class CacheBackend(object):
+  """
+    Storage of an `ObjectCache`. A backend keeps opaque values by key, the default one keeps
+    them in the process memory, a backend on a local shared store (ex: memcached on a unix
+    socket) lets several processes share the cache.
+  """
+
+  def get(self, key):
+    raise NotImplementedError()
+
+  def set(self, key, value):
+    """
+      Stores the value and returns the number of entries evicted to make room for it.
+    """
+    raise NotImplementedError()
+
+  def delete(self, key):
+    raise NotImplementedError()
+
+  def clear(self):
+    raise NotImplementedError()
+
+  def __len__(self):
+    raise NotImplementedError()
+
+
+class MemoryCacheBackend(CacheBackend):
+  """
+    LRU dict bounded to `max_size` entries.
+  """
+
+  def __init__(self, max_size=1000):
+    self.max_size = max_size
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key):
+    with self._lock:
+      value = self._entries.pop(key, None)
+      if value is not None:
+        self._entries[key] = value
+      return value
+
+  def set(self, key, value):
+    evicted = 0
+    with self._lock:
+      self._entries.pop(key, None)
+      self._entries[key] = value
+      while len(self._entries) > self.max_size:
+        self._entries.popitem(last=False)
+        evicted += 1
+    return evicted
+
+  def delete(self, key):
+    with self._lock:
+      self._entries.pop(key, None)
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+  def __len__(self):
+    return len(self._entries)
+
+
+class SQLiteCacheBackend(CacheBackend):
+  """
+    LRU store bounded to `max_size` entries kept in a sqlite database file, so the processes
+    of one host using the same `path` share the cache. Values are pickled, every thread (and
+    forked process) opens its own connection.
+
+      cache = ObjectCache(ttl=60, backend=SQLiteCacheBackend('/run/app/objects.db', 50000))
+  """
+
+  def __init__(self, path, max_size=1000, timeout=5):
+    self.path = path
+    self.max_size = max_size
+    self.timeout = timeout
+    self._local = threading.local()
+    with self._connection() as connection:
+      connection.execute(
+          'CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, used REAL)')
+      connection.execute('CREATE INDEX IF NOT EXISTS entries_used ON entries (used)')
+
+  def _connection(self):
+    connection = getattr(self._local, 'connection', None)
+    if connection is None or self._local.pid != os.getpid():
+      connection = sqlite3.connect(self.path, timeout=self.timeout)
+      connection.execute('PRAGMA journal_mode=WAL')
+      self._local.connection = connection
+      self._local.pid = os.getpid()
+    return connection
+
+  @staticmethod
+  def _key(key):
+    # repr keeps the type of the pk, ObjectId('...') and '...' are different keys
+    return repr(key)
+
+  def get(self, key):
+    with self._connection() as connection:
+      row = connection.execute(
+          'SELECT value FROM entries WHERE key = ?', (self._key(key),)).fetchone()
+      if row is None:
+        return None
+      connection.execute(
+          'UPDATE entries SET used = ? WHERE key = ?', (time.time(), self._key(key)))
+    return pickle.loads(row[0])
+
+  def set(self, key, value):
+    value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    with self._connection() as connection:
+      connection.execute(
+          'INSERT OR REPLACE INTO entries (key, value, used) VALUES (?, ?, ?)',
+          (self._key(key), sqlite3.Binary(value), time.time()))
+      excess = connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0] - self.max_size
+      if excess <= 0:
+        return 0
+      connection.execute(
+          'DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used LIMIT ?)',
+          (excess,))
+    return excess
+
+  def delete(self, key):
+    with self._connection() as connection:
+      connection.execute('DELETE FROM entries WHERE key = ?', (self._key(key),))
+
+  def clear(self):
+    with self._connection() as connection:
+      connection.execute('DELETE FROM entries')
+
+  def __len__(self):
+    return self._connection().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+
+class ObjectCache(object):
+  """
+    Process level cache of documents keyed by (collection_name, pk), shared by all requests.
+    Entries older than `ttl` seconds are dropped on access, `ttl=None` keeps them until they
+    are evicted or invalidated. Enable it on a model class, ex:
+
+      class User(models.Model):
+        manager = UserManager()
+        cache = ObjectCache(max_size=5000, ttl=60)
+
+    Writes going through `Model.create`/`Model.update` (or `manager.forget(pk)`) invalidate
+    the cached document. Only managers fetching by pk (no `_get_obj`, or `batch_get_objs`) are
+    cached, a custom `_get_obj` may scope the lookup (soft delete, account) which the
+    (collection_name, pk) key can not express.
+  """
+
+  def __init__(self, max_size=1000, ttl=300, backend=None):
+    self.ttl = ttl
+    self.backend = backend if backend is not None else MemoryCacheBackend(max_size)
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  def get(self, collection_name, pk):
+    """
+      Returns a deep copy of the cached document or None, so changes to the returned document
+      never reach the cached one.
+    """
+    key = (collection_name, pk)
+    entry = self.backend.get(key)
+    if entry is not None and entry[0] is not None and entry[0] < time.time():
+      self.backend.delete(key)
+      with self._lock:
+        self.evictions += 1
+      entry = None
+    with self._lock:
+      if entry is None:
+        self.misses += 1
+        return None
+      self.hits += 1
+    return copy.deepcopy(entry[1])
+
+  def set(self, collection_name, pk, document):
+    expires = time.time() + self.ttl if self.ttl is not None else None
+    evicted = self.backend.set((collection_name, pk), (expires, copy.deepcopy(document)))
+    if evicted:
+      with self._lock:
+        self.evictions += evicted
+
+  def invalidate(self, collection_name, pk):
+    self.backend.delete((collection_name, pk))
+
+  def clear(self):
+    self.backend.clear()
+
+  def stats(self):
+    with self._lock:
+      return {
+          'hits': self.hits,
+          'misses': self.misses,
+          'evictions': self.evictions,
+          'size': len(self.backend),
+      }
@@ -0,0 +1,79 @@
+"""
+  Created on Oct 18 2026
+"""
+from builtins import object
+import threading
+
+import cherrypy
+
+try:
+  import contextvars
+  _current_context = contextvars.ContextVar('cherrypyrest_context', default=None)
+except ImportError:
+  _current_context = None
+
+_thread_state = threading.local()
+
+
+class RequestContext(object):
+  """
+    State of one api request: the cherrypy request, the url args, the params, the object id
+    found in the url and anything permissions or handlers attach to it (ex: `object`).
+  """
+
+  def __init__(self, request, args=(), kwargs=None):
+    self.request = request
+    self.args = args
+    self.kwargs = kwargs if kwargs is not None else dict()
+    self.pk = None
+    self.etag = None
+
+
+def _holder(request):
+  # outside of a request cherrypy.serving.request is the default request object shared by all
+  # the threads, the context is kept per thread instead
+  return _thread_state if request.app is None else request
+
+
+def new_context(args=(), kwargs=None):
+  """
+    Starts the context of the current cherrypy request.
+  """
+  request = cherrypy.serving.request
+  context = _holder(request)._api_context = RequestContext(request, args, kwargs)
+  return context
+
+
+def get_context():
+  """
+    Returns the context bound to the running coroutine (see `aio.bind_context`), otherwise the
+    context of the current cherrypy request.
+  """
+  if _current_context is not None:
+    context = _current_context.get()
+    if context is not None:
+      return context
+  request = cherrypy.serving.request
+  holder = _holder(request)
+  context = getattr(holder, '_api_context', None)
+  if context is None:
+    context = holder._api_context = RequestContext(request)
+  return context
+
+
+class ContextAttribute(object):
+  """
+    Api attribute stored on the request context, so a single api instance mounted in cherrypy
+    can serve requests from all the worker threads.
+  """
+
+  def __init__(self, name):
+    self.name = name
+
+  def __get__(self, api, owner=None):
+    if api is None:
+      return self
+    return getattr(get_context(), self.name)
+
+  def __set__(self, api, value):
+    setattr(get_context(), self.name, value)
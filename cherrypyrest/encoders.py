@@ -0,0 +1,88 @@
+"""
+  Created on Oct 18 2026
+"""
+import datetime as datetime_lib
+import json
+import types
+
+import cherrypy
+from bson.objectid import ObjectId
+
+from . import utils
+
+
+def _encode_object_id(obj):
+  return utils.encode(str(obj))
+
+
+def _serialize(obj):
+  return obj.serialize()
+
+
+# type -> function returning a json serializable value. Resolved subclasses are added lazily.
+ENCODERS = {
+    ObjectId: _encode_object_id,
+    datetime_lib.datetime: utils.datetime_to_millis,
+}
+
+
+def register_encoder(klass, func):
+  """
+    Registers a function to convert instances of `klass` into json serializable values.
+  """
+  ENCODERS[klass] = func
+
+
+def resolve_encoder(klass):
+  for base in klass.__mro__[1:]:
+    if base in ENCODERS:
+      func = ENCODERS[base]
+      break
+  else:
+    func = _serialize if hasattr(klass, 'serialize') else str
+  ENCODERS[klass] = func
+  return func
+
+
+class ResponseEncoder(json.JSONEncoder):
+  """
+    Encodes the api response in a single pass. Containers are walked by json itself and
+    every other object is converted through the `ENCODERS` dispatch table.
+  """
+
+  def default(self, obj):
+    func = ENCODERS.get(obj.__class__)
+    if func is None:
+      func = resolve_encoder(obj.__class__)
+    return func(obj)
+
+
+_encoder = ResponseEncoder(separators=(',', ':'))
+
+
+def dumps(obj):
+  """
+    Returns the json representation of the given response as bytes.
+  """
+  return _encoder.encode(obj).encode('utf-8')
+
+
+def json_handler(*args, **kwargs):
+  """
+    Handler for `tools.json_out` which passes already encoded and streamed responses through.
+    Usage: config = {'tools.json_out.on': True, 'tools.json_out.handler': json_handler}
+  """
+  value = cherrypy.serving.request._json_inner_handler(*args, **kwargs)
+  if isinstance(value, (bytes, types.GeneratorType)):
+    return value
+  return dumps(value)
+
+
+def encoded_by_json_out():
+  """
+    True when `tools.json_out` encodes the value returned by the current handler with a
+    handler other than `json_handler`: apis then return json serializable values, not bytes.
+  """
+  request = cherrypy.serving.request
+  return (getattr(request, '_json_inner_handler', None) is not None and
+          request.handler is not json_handler)
@@ -0,0 +1,69 @@
+"""
+  Created on Oct 18 2026
+"""
+import logging
+import queue
+import threading
+import traceback
+
+import cherrypy
+
+try:
+  from logging.handlers import QueueHandler, QueueListener
+except ImportError:
+  QueueHandler = QueueListener = None
+
+
+logger = logging.getLogger('cherrypyrest.errors')
+logger.propagate = False
+
+_queue = queue.Queue(-1)
+_lock = threading.Lock()
+_listener = []
+
+
+def start(*handlers):
+  """
+    Starts the thread writing the queued server errors to the given logging handlers
+    (stderr by default). Called on the first error if not called at startup.
+  """
+  with _lock:
+    if _listener:
+      return
+    handlers = handlers or (logging.StreamHandler(),)
+    if QueueListener is None:
+      # python 2: no queue support in logging, the handlers are called directly
+      for handler in handlers:
+        logger.addHandler(handler)
+      _listener.append(None)
+      return
+    logger.addHandler(QueueHandler(_queue))
+    listener = QueueListener(_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listener.append(listener)
+  cherrypy.engine.subscribe('stop', stop)
+
+
+def stop():
+  with _lock:
+    if not _listener:
+      return
+    listener = _listener.pop()
+    for handler in list(logger.handlers):
+      logger.removeHandler(handler)
+  if listener is not None:
+    listener.stop()
+  cherrypy.engine.unsubscribe('stop', stop)
+
+
+def log_server_error(message):
+  """
+    Formats the traceback of the exception being handled once, queues it for the logging
+    thread and returns it. The request thread never waits on the log output.
+  """
+  if not _listener:
+    start()
+  trace = traceback.format_exc()
+  request = cherrypy.serving.request
+  logger.error('%s %s: %s\n%s', request.method, request.path_info, message, trace)
+  return trace
@@ -0,0 +1,51 @@
+"""
+  Created on Oct 18 2026
+"""
+import hashlib
+
+
+# returned by `GenericAPI.call_handler` when the validator matches and the handler is skipped
+NOT_MODIFIED = object()
+
+
+def make_etag(value):
+  """
+    Returns a strong etag for a validator value (a version, an updated at datetime, ...) or
+    for the encoded response body (bytes).
+  """
+  if not isinstance(value, bytes):
+    value = repr(value).encode('utf-8')
+  return '"{}"'.format(hashlib.sha1(value).hexdigest())
+
+
+def etag_matches(etag, if_none_match):
+  """
+    Weak comparison of the etag with an If-None-Match header, as required for GET requests.
+  """
+  if not if_none_match:
+    return False
+  if if_none_match.strip() == '*':
+    return True
+  candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+  return any(
+      (candidate[2:] if candidate.startswith('W/') else candidate) == etag
+      for candidate in candidates
+  )
+
+
+def version_validator(resp, version_field):
+  """
+    Returns the (pk, version) pairs of the returned object(s), or None if one of them has
+    no version. `resp` is a document, a model object, a record or a list of them.
+  """
+  items = resp if isinstance(resp, (list, tuple)) else [resp]
+  validator = list()
+  for item in items:
+    getter = getattr(item, 'get', None)
+    if getter is None:
+      return None
+    version = getter(version_field)
+    if version is None:
+      return None
+    validator.append((getter('_id'), version))
+  return validator
@@ -3,27 +3,20 @@
   @author: Umesh Chaudhary
 """
 from __future__ import print_function
-from builtins import str
-import json
 
 import cherrypy
+from cherrypy._cperror import clean_headers
+
+from .encoders import ResponseEncoder
+from .encoders import dumps
 
 
 # the below variable will be used to store the error response and will be used to send in so lgger response
 ERROR_RESP = dict()
 
 
-class CustomEncoder(json.JSONEncoder):
-  def default(self, obj):
-    try:
-      return json.JSONEncoder.default(self, obj)
-    except:
-      pass
-    try:
-      return str(obj)
-    except:
-      pass
-    return 'NA'
+# kept for backward compatibility, use `encoders.ResponseEncoder`
+CustomEncoder = ResponseEncoder
 
 
 class APIException(cherrypy.HTTPError):
@@ -38,11 +31,16 @@ class APIException(cherrypy.HTTPError):
     self._api_err_resp = resp
 
   def set_response(self):
-    super(APIException, self).set_response()
-    resp = json.dumps(self._api_err_resp, cls=CustomEncoder).encode('utf-8')
+    # HTTPError.set_response is not called, it formats a traceback and renders an html error
+    # page which would be replaced by the json body anyway
+    clean_headers(self.code)
+    cherrypy.serving.response.status = self.status
+    resp = dumps(self._api_err_resp)
     if self.status >= 500:
+      # the details (traceback) are kept for the logger, the client gets a generic error
       ERROR_RESP[id(cherrypy.request)] = resp
       self._api_err_resp = {'success': False, 'message': 'Internal server error'}
+      resp = dumps(self._api_err_resp)
     cherrypy.serving.response.body = resp
     cherrypy.response.headers['Content-Type'] = 'application/json'
-    cherrypy.response.headers['Content-Length'] = len(json.dumps(self._api_err_resp, cls=CustomEncoder))
+    cherrypy.response.headers['Content-Length'] = len(resp)
@@ -9,7 +9,6 @@ import datetime as datetime_lib
 import re
 
 from bson.objectid import ObjectId
-from dateutil import parser as dt_parser
 
 from . import messages
 from . import utils
@@ -138,7 +137,7 @@ class DateTime(Field):
   def _validate_object(self, value):
     if isinstance(value, (str, bytes)):
       try:
-        value = dt_parser.parse(value)
+        value = utils.parse_datetime_string(value)
       except:
         raise Exception(
             400, messages.VALIDATION_ERROR,
@@ -176,7 +175,7 @@ class DateField(Field):
   def _validate_object(self, value):
     if isinstance(value, (str, bytes)):
       try:
-        value = dt_parser.parse(value).date()
+        value = utils.parse_date_string(value)
       except:
         raise Exception(
             400, messages.VALIDATION_ERROR,
@@ -195,7 +194,7 @@ class DateField(Field):
     return value.isoformat()
 
   def _db_repr_object(self, value):
-    return dt_parser.parse(value.isoformat())
+    return datetime_lib.datetime.combine(value, datetime_lib.time())
 
 
 class TimeField(Field):
@@ -203,7 +202,7 @@ class TimeField(Field):
   def _validate_object(self, value):
     if isinstance(value, (str, bytes)):
       try:
-        value = dt_parser.parse(value).time()
+        value = utils.parse_time_string(value)
       except:
         raise Exception(
             400, messages.VALIDATION_ERROR,
@@ -335,6 +334,11 @@ class ObjectID(Field):
 
   def _validate_object(self, value):
     if not isinstance(value, ObjectId):
+      if not utils.is_token(str(value)):
+        raise Exception(
+            400, messages.VALIDATION_ERROR,
+            messages.INVALID_OBJECT_ID
+        )
       try:
         value = ObjectId(utils.decode(str(value)))
       except:
@@ -377,6 +381,8 @@ class RelatedField(Field):
     return self._opr_on_related_object(value, '_db_repr_related_object')
 
   def _serialize_object(self, value):
+    if self.many and hasattr(self.child, 'bulk_serialize'):
+      return self.child.bulk_serialize(value)
     return self._opr_on_related_object(value, '_serialize_related_object')
 
   def _validate_related_object(self, value):
@@ -0,0 +1,128 @@
+"""
+  Created on Oct 18 2026
+"""
+from builtins import object
+from collections import OrderedDict
+import threading
+import weakref
+
+import cherrypy
+
+
+class BatchLoader(object):
+  """
+    Collects the deferred (lazily loaded) model objects of a request per manager. When one of
+    them is accessed, all the pending objects of the same manager are fetched with a single
+    `manager._get_objs` call, so touching a related field on N rows costs one query instead of N.
+  """
+
+  def __init__(self):
+    self._pending = dict()
+
+  def add(self, obj):
+    manager = obj.manager
+    if manager not in self._pending:
+      self._pending[manager] = weakref.WeakSet()
+    self._pending[manager].add(obj)
+
+  def load(self, obj, plans=None, projection=None):
+    """
+      Loads `obj` together with every other pending object of its manager. When `plans` is
+      given only those fields are fetched, with `projection`, for the objects deferring them.
+      Returns the document of `obj` or None if it does not exist.
+    """
+    manager = obj.manager
+    attr = next((plan.attr for plan in plans if plan.attr != 'pk'), None) if plans else None
+    pending = [item for item in self._pending.pop(manager, ()) if item is not obj and item.is_deferred()]
+    batch = [item for item in pending if item.is_deferred(attr)]
+    batch.append(obj)
+    pks = list(OrderedDict((item.pk, None) for item in batch))
+    if plans is None:
+      found = manager._get_objs(pks)
+    else:
+      found = manager._get_fields(pks, projection)
+    documents = dict()
+    for document in found:
+      if document:
+        documents[document['_id']] = document
+    identity_map = get_identity_map() if plans is None else None
+    for item in batch:
+      if identity_map is not None and item.pk in documents:
+        identity_map.add_instance(manager, item.pk, item)
+      if item is not obj and item.pk in documents:
+        item._load_document(documents[item.pk], plans)
+    for item in pending + [obj]:
+      if item.is_deferred():
+        self.add(item)
+    return documents.get(obj.pk)
+
+
+class IdentityMap(object):
+  """
+    Documents and model objects fetched during one request, keyed by the manager's collection
+    and the primary key, so every document is read from the database at most once per request
+    and the same pk maps to the same model object.
+  """
+
+  def __init__(self):
+    self._documents = dict()
+    self._instances = dict()
+
+  @staticmethod
+  def _key(manager, pk):
+    return getattr(manager, 'collection_name', None) or manager.__class__, pk
+
+  def has_document(self, manager, pk):
+    return self._key(manager, pk) in self._documents
+
+  def get_document(self, manager, pk):
+    return self._documents.get(self._key(manager, pk))
+
+  def add_document(self, manager, pk, document):
+    self._documents[self._key(manager, pk)] = document
+
+  def get_instance(self, manager, pk):
+    return self._instances.get(self._key(manager, pk))
+
+  def add_instance(self, manager, pk, instance):
+    return self._instances.setdefault(self._key(manager, pk), instance)
+
+  def forget(self, manager, pk):
+    key = self._key(manager, pk)
+    self._documents.pop(key, None)
+    self._instances.pop(key, None)
+
+  def clear(self):
+    self._documents.clear()
+    self._instances.clear()
+
+
+_thread_state = threading.local()
+
+
+def get_loader():
+  """
+    Returns the batch loader of the current request. Outside of a request the default request
+    object of cherrypy is shared by all the threads, so the loader is kept per thread instead.
+  """
+  request = cherrypy.serving.request
+  holder = _thread_state if request.app is None else request
+  loader = getattr(holder, '_batch_loader', None)
+  if loader is None:
+    loader = holder._batch_loader = BatchLoader()
+  return loader
+
+
+def get_identity_map():
+  """
+    Returns the identity map of the current request, created on first use and cleared at the
+    end of the request. Returns None outside of a request so nothing is cached across requests.
+  """
+  request = cherrypy.serving.request
+  if request.app is None:
+    return None
+  identity_map = getattr(request, '_identity_map', None)
+  if identity_map is None:
+    identity_map = request._identity_map = IdentityMap()
+    request.hooks.attach('on_end_request', identity_map.clear)
+  return identity_map
@@ -4,37 +4,185 @@
 """
 from builtins import object
 import os
-import threading
+import cherrypy
 import mongomock
 
 from collections import defaultdict
+from functools import wraps
+
+from future.utils import with_metaclass
+from pymongo import UpdateOne
 # from reschedge_modules.Utils import TEST_DB
 # from reschedge_modules.Utils import new_mongo_client
 # from settings import DATABASE as DATABASE_NAME
 
+from .loaders import get_identity_map
+from .pool import ClientPool
 from .utils import unicode_to_str_wrapper
 
 
-THREAD_POOL = dict()
+# you need to set a factory creating a mongo client EX: MongoClient() in your settings file
+CLIENT_POOL = ClientPool()
+MOCK_DATABASE = []
+
+
+def get_mock_database():
+  # a single mongomock database is kept so the data persists between accesses while testing
+  if not MOCK_DATABASE:
+    MOCK_DATABASE.append(mongomock.MongoClient().get_database('test'))
+  return MOCK_DATABASE[0]
 
 
-class BaseManager(object):
+def raw_result(func):
   """
-    Base class for all managers. Every manager class must be derived from this one.
+    Marks a manager method whose result must not be post processed by `unicode_to_str_wrapper`.
   """
-  _excluded_attrs_from_wrapper = ['db', 'collection', 'client']
-  _manager_methods = []
+  func._raw_result = True
+  return func
+
+
+def borrows_client(func):
+  """
+    Runs a manager method called outside of a cherrypy request through `pool.run_operation`,
+    so worker threads hold a pooled client only for the duration of the call.
+  """
+  @wraps(func)
+  def wrapper(self, *args, **kwargs):
+    if cherrypy.serving.request.app is not None:
+      return func(self, *args, **kwargs)
+    return self.pool.run_operation(func, self, *args, **kwargs)
+  return wrapper
+
+
+def _fetch_obj(manager, func, pk):
+  cache = manager.cache
+  if cache is None or not manager._batches_by_pk():
+    return func(manager, pk)
+  document = cache.get(manager.collection_name, pk)
+  if document is None:
+    document = func(manager, pk)
+    if document:
+      cache.set(manager.collection_name, pk, document)
+  return document
+
+
+def _fetch_objs(manager, func, pks):
+  cache = manager.cache
+  if cache is None or not manager._batches_by_pk():
+    return func(manager, pks)
+  documents = []
+  missing = []
+  for pk in pks:
+    document = cache.get(manager.collection_name, pk)
+    if document is None:
+      missing.append(pk)
+    else:
+      documents.append(document)
+  if missing:
+    for document in func(manager, missing):
+      if document:
+        cache.set(manager.collection_name, document['_id'], document)
+        documents.append(document)
+  return documents
+
+
+def cached_get_obj(func):
+  """
+    Makes `_get_obj` consult the identity map of the current request and then the object
+    cache of the manager before querying the database.
+  """
+  @wraps(func)
+  def wrapper(self, pk, *args, **kwargs):
+    if args or kwargs:
+      return func(self, pk, *args, **kwargs)
+    identity_map = get_identity_map()
+    if identity_map is None:
+      return _fetch_obj(self, func, pk)
+    if not identity_map.has_document(self, pk):
+      identity_map.add_document(self, pk, _fetch_obj(self, func, pk))
+    return identity_map.get_document(self, pk)
+  return wrapper
 
-  def __init__(self):
-    self._manager_methods = self.__class__._manager_methods
-    for key in list(self.__class__.__dict__.keys()):
-      if key.startswith('_'):
+
+def cached_get_objs(func):
+  """
+    Makes `_get_objs` fetch only the documents missing from the identity map of the request
+    and from the object cache of the manager.
+  """
+  @wraps(func)
+  def wrapper(self, pks):
+    identity_map = get_identity_map()
+    if identity_map is None:
+      return _fetch_objs(self, func, pks)
+    missing = [pk for pk in pks if not identity_map.has_document(self, pk)]
+    if missing:
+      for document in _fetch_objs(self, func, missing):
+        if document:
+          identity_map.add_document(self, document['_id'], document)
+      for pk in missing:
+        if not identity_map.has_document(self, pk):
+          identity_map.add_document(self, pk, None)
+    return [identity_map.get_document(self, pk) for pk in pks]
+  return wrapper
+
+
+class ManagerMeta(type):
+  """
+    Wraps the public methods of every manager class with `unicode_to_str_wrapper` once, when
+    the class is created, instead of on every attribute access. Instance methods also borrow a
+    pooled client for the duration of calls made outside of a cherrypy request.
+  """
+  registry = defaultdict(dict)
+
+  def __init__(klass, name, bases, dct):
+    super(ManagerMeta, klass).__init__(name, bases, dct)
+    for base in klass.mro()[1:-1]:
+      ManagerMeta.registry[base].update({klass.__name__: klass})
+
+    if '_get_obj' in dct:
+      klass._get_obj = cached_get_obj(borrows_client(dct['_get_obj']))
+    if '_get_objs' in dct:
+      klass._get_objs = cached_get_objs(borrows_client(dct['_get_objs']))
+    if '_get_fields' in dct:
+      klass._get_fields = borrows_client(dct['_get_fields'])
+
+    klass._manager_methods = [
+        key for key in getattr(klass, '_manager_methods', []) if key not in dct
+    ]
+    for key, value in list(dct.items()):
+      if key.startswith('_') or key in klass._excluded_attrs_from_wrapper:
         continue
-      if key in self._excluded_attrs_from_wrapper:
+      decorator = None
+      if isinstance(value, (staticmethod, classmethod)):
+        decorator, value = type(value), value.__func__
+      if not callable(value) or isinstance(value, type):
         continue
-      if not callable(object.__getattribute__(self, key)):
+      if getattr(value, '_raw_result', False):
+        if decorator is None:
+          setattr(klass, key, borrows_client(value))
         continue
-      self._manager_methods.append(key)
+      wrapper = wraps(value)(unicode_to_str_wrapper(value))
+      setattr(klass, key, decorator(wrapper) if decorator else borrows_client(wrapper))
+      klass._manager_methods.append(key)
+
+
+class BaseManager(with_metaclass(ManagerMeta, object)):
+  """
+    Base class for all managers. Every manager class must be derived from this one.
+    Public methods are wrapped with `unicode_to_str_wrapper`, decorate a method with
+    `raw_result` to return its result as it is.
+  """
+  _excluded_attrs_from_wrapper = ['db', 'collection', 'client', 'borrow', 'forget']
+  _manager_methods = []
+  pool = CLIENT_POOL
+  backend = None
+  # `cache.ObjectCache` shared by all requests, usually set through the `cache` of the model
+  cache = None
+  # number of documents sent to the database in one bulk write
+  bulk_chunk_size = 500
+  # set to True when `_get_obj` only looks the pk up (no soft delete, account scoping, ...),
+  # so lazy loads are batched into one `$in` query instead of calling `_get_obj` for each pk
+  batch_get_objs = False
 
   @property
   def client(self):
@@ -42,22 +190,29 @@ class BaseManager(object):
       We need a separate mongo client for every thread otherwise there can be a deadlock issue
       For more information check the link below
       LINK: https://api.mongodb.com/python/current/faq.html#multiprocessing
-    """
 
-    _current_thread = threading.currentThread().name
-    # Try to find the current active thread in thread pool. If a mongo client object for this
-    # thread exists then return that object for thread, or create a new mongo client object
-    # for the active thread and push it in the thread pool.
-    if _current_thread in THREAD_POOL:
-      return THREAD_POOL[_current_thread]
+      Clients are borrowed from the bounded `pool`. The client leased by the current thread is
+      returned at the end of the cherrypy request or of a `borrow()` block. Configure the pool
+      with `CLIENT_POOL.configure(factory=new_mongo_client, max_size=...)`.
+    """
+    return self.pool.acquire()
 
-    THREAD_POOL[_current_thread] = {} # new_mongo_client() # you need to create a mongo client EX: MongoClient() in your settings file and import it here
-    return THREAD_POOL[_current_thread]
+  def borrow(self):
+    """
+      Context manager leasing a client outside of a cherrypy request, ex: in worker threads.
+    """
+    return self.pool.borrow()
 
   @property
   def db(self):
+    """
+      Returns the storage backend of the manager. Set `backend` on a manager class (or on
+      BaseManager for all of them) to a `backends.Backend`, ex: MemoryBackend for load tests.
+    """
+    if self.backend is not None:
+      return self.backend
     if os.environ.get('APP_ENVIRONMENT', 'DEVELOPMENT') == 'TESTING':
-      return mongomock.MongoClient()
+      return get_mock_database()
     return {} # self.client[DATABASE_NAME]  # you need to create a mongo_lient
 
   # def new_mongo_client():
@@ -69,21 +224,121 @@ class BaseManager(object):
       return None
     return self.db.get_collection(self.collection_name)
 
-  class __metaclass__(type):
-    __subclasses__ = defaultdict(dict)
-
-    def __new__(meta, name, bases, dct):
-      klass = type.__new__(meta, name, bases, dct)
-      for base in klass.mro()[1:-1]:
-        meta.__subclasses__[base].update({klass.__name__: klass})
-      return klass
-
-  def __getattribute__(self, attr_name):
-    attribute = object.__getattribute__(self, attr_name)
-    if attr_name not in object.__getattribute__(self, '_manager_methods'):
-      return attribute
-    try:
-      return unicode_to_str_wrapper(attribute)
-    except Exception as ex:
-      pass
-    return attribute
+  @raw_result
+  def get_instance(self, pk):
+    """
+      Returns the model object of the given pk or None. Within a request the same object is
+      returned for the same pk. The object is an instance of the model declaring the manager.
+    """
+    identity_map = get_identity_map()
+    if identity_map is not None:
+      instance = identity_map.get_instance(self, pk)
+      if instance is not None:
+        return instance
+    if hasattr(self, '_get_obj'):
+      document = self._get_obj(pk)
+    else:
+      documents = self._get_objs([pk])
+      document = documents[0] if documents else None
+    if not document:
+      return None
+    instance = self.model()
+    instance.set_value(document)
+    instance.mark_clean(document)
+    if identity_map is not None:
+      instance = identity_map.add_instance(self, pk, instance)
+    return instance
+
+  def forget(self, pk):
+    """
+      Drops the given pk from the identity map of the current request and from the object
+      cache, call it after every write which doesn't go through `Model.create`/`Model.update`.
+    """
+    identity_map = get_identity_map()
+    if identity_map is not None:
+      identity_map.forget(self, pk)
+    if self.cache is not None and getattr(self, 'collection_name', None):
+      self.cache.invalidate(self.collection_name, pk)
+
+  def update_fields(self, pk, update):
+    """
+      Applies a `$set` update document to the given pk. Used by `Model.update` for objects
+      loaded from the database, override it to add extra fields (ex: updated_at) to the update.
+    """
+    return self.collection.update_one({'_id': pk}, update)
+
+  def find_page(self, query, sort, limit, projection=None):
+    """
+      Returns up to `limit` documents matching `query` in the `sort` order. Used by the keyset
+      pagination of `ListAPI`, index the sort fields so every page costs the same.
+    """
+    return list(self.collection.find(query, projection).sort(sort).limit(limit))
+
+  @staticmethod
+  def _chunks(items, chunk_size):
+    for start in range(0, len(items), chunk_size):
+      yield items[start:start + chunk_size]
+
+  @raw_result
+  def bulk_create(self, objs, chunk_size=None):
+    """
+      Inserts the given (already validated) model objects with one `insert_many` per chunk,
+      sets their pks and returns the inserted ids.
+    """
+    documents = list()
+    for obj in objs:
+      document = obj.db_repr()
+      if document.get('_id') is None:
+        document.pop('_id', None)
+      documents.append(document)
+    inserted_ids = list()
+    for chunk in self._chunks(documents, chunk_size or self.bulk_chunk_size):
+      inserted_ids.extend(self.collection.insert_many(chunk, ordered=True).inserted_ids)
+    for obj, inserted_id in zip(objs, inserted_ids):
+      obj.pk = inserted_id
+    return inserted_ids
+
+  @raw_result
+  def bulk_update(self, objs, chunk_size=None):
+    """
+      Updates the given (already validated) model objects with one `bulk_write` of `$set`
+      operations per chunk. Returns the number of matched documents.
+    """
+    requests = list()
+    for obj in objs:
+      document = obj.db_repr()
+      document.pop('_id', None)
+      requests.append(UpdateOne({'_id': obj.pk}, {'$set': document}))
+    matched = 0
+    for chunk in self._chunks(requests, chunk_size or self.bulk_chunk_size):
+      matched += self.collection.bulk_write(chunk, ordered=False).matched_count
+    return matched
+
+  def _batches_by_pk(self):
+    """
+      True when the documents can be fetched by pk with one `$in` query, and cached by pk: the
+      manager has a collection and either no `_get_obj` or one declared as a plain lookup
+      (`batch_get_objs`).
+    """
+    if not getattr(self, 'collection_name', None):
+      return False
+    return self.batch_get_objs or not hasattr(self, '_get_obj')
+
+  def _get_objs(self, pks):
+    """
+      Fetches the documents of the given primary keys. Used by the batch loader of lazily
+      loaded models. A custom `_get_obj` is called for each pk unless `batch_get_objs` is set,
+      override this method to batch the lookups of such a manager.
+    """
+    if not self._batches_by_pk():
+      return [self._get_obj(pk) for pk in pks]
+    return list(self.collection.find({'_id': {'$in': list(pks)}}))
+
+  def _get_fields(self, pks, projection):
+    """
+      Fetches only the fields selected by the mongo `projection` of the given primary keys in
+      one query. Used to load the load groups of lazily loaded models.
+    """
+    if not self._batches_by_pk():
+      return [self._get_obj(pk) for pk in pks]
+    return list(self.collection.find({'_id': {'$in': list(pks)}}, projection))
@@ -43,3 +43,7 @@ INVALID_TIME = 'Invalid time format.'
 METHOD_MUST_BE_IMPLEMENTED = 'Method must be implemented'
 SERVER_ERROR = 'Server error'
 INVALID_FIELD_MAPPING = 'Invalid Field Maping {}'
+INVALID_CURSOR = 'Invalid pagination cursor.'
+SHARED_MANAGER_CACHE = 'Model \'{}\' shares its manager with \'{}\' but not its cache, declare a separate manager.'
+INVALID_LIMIT = 'Invalid limit. A number between 1 and {} is required.'
+REQUEST_TOO_LARGE = 'Request body too large. Maximum size is {} bytes.'
@@ -5,19 +5,213 @@
 from __future__ import absolute_import
 from builtins import str
 from builtins import object
-import traceback
+import copy
+
+from future.utils import with_metaclass
 
 # noinspection Pylint
 from . import fields
+from . import loaders
 from . import managers
 from . import messages
 from . import utils
 
 
-class Model(object):
+class FieldPlan(object):
+  """
+    Everything needed to populate, store and serialize one field of a model,
+    resolved once per model class.
+  """
+  __slots__ = ('name', 'attr', 'field_class', 'alias', 'key', 'error_key', 'local',
+               'setter', 'getter', 'serializer')
+
+  def __init__(self, model_class, name):
+    self.name = name
+    # `_id` is stored in the `pk` attribute
+    self.attr = 'pk' if name == '_id' else name
+    self.field_class = getattr(model_class, self.attr, None)
+    self.alias = model_class.alias.get(name)
+    self.key = model_class.alias.get(name, name)
+    self.error_key = model_class.alias.get(self.attr, self.attr)
+    # nested models declared in the same module are called without a value
+    self.local = (self.field_class is not None and
+                  self.field_class.__module__ == model_class.__module__)
+    self.setter = _function(getattr(model_class, 'set_{}'.format(name), model_class.set))
+    self.getter = _function(getattr(model_class, 'get_{}'.format(name), None))
+    self.serializer = _function(getattr(model_class, 'serialize_{}'.format(name), None))
+
+
+def _function(hook):
+  # unbound methods (python 2) are unwrapped so hooks can be called with records as well
+  if hook is not None and getattr(hook, '__self__', None) is None:
+    return getattr(hook, '__func__', hook)
+  return hook
+
+
+class LazyField(object):
+  """
+    Non data descriptor installed for every field of a model. Populated values live in the
+    instance dict and are read at plain attribute speed, so the descriptor is only reached for
+    fields which are not set or are deferred. Deferred fields (populated with `fields.Empty`)
+    load the object (or the load group of the field) from the database on first access.
+  """
+  __slots__ = ('attr', 'field_class')
+
+  def __init__(self, attr, field_class):
+    self.attr = attr
+    self.field_class = field_class
+
+  def __get__(self, obj, owner=None):
+    if obj is None:
+      return self.field_class
+    if self.attr in obj.__dict__.get('_deferred', ()):
+      obj._load_deferred(self.attr)
+      return obj.__dict__.get(self.attr, self.field_class)
+    return self.field_class
+
+
+class ModelMeta(type):
+  """
+    Compiles the field plans of every model class when the class is created, so the per row
+    methods don't have to look up field classes, hooks and aliases by name.
+  """
+
+  def __init__(cls, name, bases, dct):
+    super(ModelMeta, cls).__init__(name, bases, dct)
+    cls._plan = [FieldPlan(cls, field) for field in cls.fields]
+    cls._public_plan = [FieldPlan(cls, field) for field in cls.public_fields or cls.fields]
+    # the field schema is shared by all instances of the class
+    cls._fields = dict()
+    cls._invalid_field = None
+    for plan in cls._plan:
+      if plan.field_class is None:
+        cls._invalid_field = cls._invalid_field or plan.attr
+        continue
+      plan.field_class.name = plan.attr
+      plan.field_class.model = cls
+      cls._fields[plan.attr] = plan.field_class
+      setattr(cls, '_{}'.format(plan.attr), plan.field_class)
+      if plan.attr != 'pk':
+        setattr(cls, plan.attr, LazyField(plan.attr, plan.field_class))
+    cls._load_groups = cls._compile_load_groups()
+    # the manager builds its objects (`get_instance`) with the model declaring it
+    if dct.get('manager') is not None:
+      dct['manager'].model = cls
+    ModelMeta.attach_cache(cls, dct)
+
+  @staticmethod
+  def attach_cache(cls, dct):
+    """
+      The cache of a model is set on its manager, so the models sharing a manager must share
+      its cache. A model declaring `cache` with an inherited manager also caches the documents
+      its ancestors load through that manager.
+    """
+    manager = getattr(cls, 'manager', None)
+    if manager is None:
+      return
+    if '_models' not in manager.__dict__:
+      manager._models = []
+    if 'cache' in dct:
+      for model in manager._models:
+        if model.cache is dct['cache'] or (issubclass(cls, model) and model.cache is None):
+          continue
+        raise Exception(500, messages.SERVER_ERROR,
+                        messages.SHARED_MANAGER_CACHE.format(model.__name__, cls.__name__))
+      manager.cache = dct['cache']
+    elif cls.cache is not manager.cache:
+      for model in manager._models:
+        if model.cache is manager.cache:
+          raise Exception(500, messages.SERVER_ERROR,
+                          messages.SHARED_MANAGER_CACHE.format(cls.__name__, model.__name__))
+    manager._models.append(cls)
+
+
+def serialize_fields(obj, plans, raw_fields=()):
+  dict_obj = dict()
+  for plan in plans:
+    if plan.name in raw_fields:
+      dict_obj[plan.key] = getattr(obj, plan.attr)
+      continue
+    if plan.serializer is not None:
+      dict_obj[plan.key] = plan.serializer(obj)
+      continue
+    value = getattr(obj, plan.attr)
+    if hasattr(value, 'serialize'):
+      if '_id' in getattr(value, 'fields', []):
+        dict_obj[plan.name] = value._pk.serialize(value.pk)
+        continue
+      value = value.serialize()
+    elif plan.local:
+      value = plan.field_class.serialize()
+    else:
+      value = plan.field_class.serialize(value)
+    dict_obj[plan.key] = value
+  return dict_obj
+
+
+def db_repr_fields(obj, plans):
+  dict_obj = dict()
+  for plan in plans:
+    if plan.getter is not None:
+      dict_obj[plan.name] = plan.getter(obj)
+      continue
+    value = getattr(obj, plan.attr)
+    if hasattr(value, 'db_repr'):
+      if '_id' in getattr(value, 'fields', []):
+        dict_obj[plan.name] = value.pk
+        continue
+      value = value.db_repr()
+    elif plan.local:
+      value = plan.field_class.db_repr()
+    else:
+      value = plan.field_class.db_repr(value)
+    dict_obj[plan.name] = value
+  return dict_obj
+
+
+class Record(object):
+  """
+    Compact representation of a model object. Record classes are generated per model by
+    `Model.record_class` with `__slots__` for the fields only, the schema stays on the class.
+    Records are meant for read paths such as large listings: they are not lazy loaded and
+    hooks defined on the model are called with the record.
+  """
+  __slots__ = ()
+  fields = []
+  _plan = []
+  _public_plan = []
+
+  @property
+  def _id(self):
+    return self.pk
+
+  def serialize(self, raw_fields=()):
+    return serialize_fields(self, self._public_plan, raw_fields)
+
+  def db_repr(self):
+    return db_repr_fields(self, self._plan)
+
+  def __getitem__(self, attr):
+    if attr == '_id':
+      attr = 'pk'
+    return getattr(self, attr)
+
+  def get(self, attr, default=None):
+    return getattr(self, attr, default)
+
+
+class Model(with_metaclass(ModelMeta, object)):
   public_fields = []
   read_only_fields = []
   alias = dict()
+  # fields loaded separately from the rest of a lazily loaded object, ex: large blobs.
+  # Every deferred field is its own load group, `load_groups` maps a group name to the
+  # fields loaded together, ex: {'body': ['content', 'attachments']}
+  deferred_fields = []
+  load_groups = dict()
+  # set to True to save objects loaded from the database with a `$set` of their
+  # changed fields through `manager.update_fields` instead of `manager.update`
+  partial_updates = False
 
   # obj fields
   fields = []
@@ -29,30 +223,19 @@ class Model(object):
   _required = False
 
   manager = managers.BaseManager()
+  # set to a `cache.ObjectCache` to cache the documents of this model across requests
+  cache = None
 
   def __init__(self, **kwargs):
 
-    self._fields = dict()
+    if self._invalid_field:
+      raise Exception(
+          500, messages.SERVER_ERROR,
+          messages.INVALID_FIELD_MAPPING.format(
+              self._invalid_field, self.__class__.__name__
+          )
+      )
     self.db_fields = self.fields
-    for field in self.fields:
-      if field is '_id':
-        field = 'pk'
-      try:
-        field_class = getattr(self, field)
-      except:
-        # print traceback.format_exc()
-        raise Exception(
-            500, messages.SERVER_ERROR,
-            messages.INVALID_FIELD_MAPPING.format(
-                field, self.__class__.__name__,
-                traceback.format_exc()
-            )
-        )
-      field_class.name = field
-      field_class.model = self
-      self._fields[field] = field_class
-      # setattr(self, field, field_class.default)
-      setattr(self, '_{}'.format(field), field_class)
     if 'required' in kwargs:
       assert isinstance(kwargs['required'], bool)
       self._required = kwargs['required']
@@ -60,8 +243,6 @@ class Model(object):
       assert isinstance(kwargs['null'], bool)
       self._null = kwargs['null']
 
-    self.manager.model = self.__class__
-
   def _populate_data(self, value, validate=False):
     self.initial_data = value
     self._populate_fields(value, validate=validate)
@@ -77,32 +258,25 @@ class Model(object):
           400, messages.VALIDATION_ERROR,
           messages.INVALID_DATA_FORMAT.format('dict', type(data))
       )
-    for field in self.fields:
-      if field is '_id':
-        field_class = getattr(self, '_pk')
-      else:
-        field_class = getattr(self, '_{}'.format(field))
-      setter = getattr(self, 'set_{}'.format(field), self.set)
-      value = data.get(field)
+    for plan in self._plan:
+      value = data.get(plan.name)
       if not value and value != 0:
-        value = data.get(self.alias.get(field))
+        value = data.get(plan.alias)
 
       if isinstance(value, fields.Empty):
-        # print 'valie us empty'
         if not validate:
-          # print 'validate is false, settings attr to empty'
-          setattr(self, field, value)
-          # print 'done'
+          if plan.attr == 'pk':
+            self.pk = value
+          else:
+            self._defer(plan.attr)
           continue
         value = None
 
       try:
-        if field == '_id':
-          field = 'pk'
-        setter(field, field_class, value)
+        plan.setter(self, plan.attr, plan.field_class, value)
       except Exception as ex:
         # print traceback.format_exc()
-        errors[self.alias.get(field, field)] = ex.args[2] if len(ex.args) >= 2 else ex.args[0]
+        errors[plan.error_key] = ex.args[2] if len(ex.args) >= 2 else ex.args[0]
     if errors:
       raise Exception(400, messages.VALIDATION_ERROR, errors)
 
@@ -137,52 +311,169 @@ class Model(object):
     return self.pk
 
   def db_repr(self):
-    dict_obj = dict()
-    for field in self.fields:
-      if hasattr(self, 'get_{}'.format(field)):
-        dict_obj[field] = getattr(self, 'get_{}'.format(field))()
-        continue
-      value = getattr(self, field)
-      if hasattr(value, 'db_repr'):
-        if '_id' in getattr(value, 'fields', []):
-          dict_obj[field] = value.pk
+    return db_repr_fields(self, self._plan)
+
+  def serialize(self, raw_fields=()):
+    return serialize_fields(self, self._public_plan, raw_fields)
+
+  @classmethod
+  def _compile_load_groups(cls):
+    """
+      Returns attr -> (plans, projection) of the load group of every field, or an empty dict
+      when the model has no load groups and lazy loads fetch the whole document.
+    """
+    groups = [[name] for name in cls.deferred_fields] + list(cls.load_groups.values())
+    if not groups:
+      return dict()
+    load_groups = dict()
+    grouped = set()
+    for names in groups:
+      plans = tuple(plan for plan in cls._plan if plan.name in names)
+      projection = dict((plan.name, 1) for plan in plans)
+      for plan in plans:
+        load_groups[plan.attr] = (plans, projection)
+        grouped.add(plan.attr)
+    plans = tuple(plan for plan in cls._plan if plan.attr not in grouped)
+    projection = dict((plan.name, 0) for plan in cls._plan if plan.attr in grouped)
+    for plan in plans:
+      load_groups[plan.attr] = (plans, projection)
+    return load_groups
+
+  @classmethod
+  def record_class(cls):
+    """
+      Returns the slotted `Record` class of the model, generated on first use.
+    """
+    if '_record_class' not in cls.__dict__:
+      attrs = dict(('_{}'.format(plan.attr), plan.field_class) for plan in cls._plan)
+      attrs.update({
+          '__slots__': tuple(plan.attr for plan in cls._plan),
+          'fields': cls.fields,
+          '_plan': cls._plan,
+          '_public_plan': cls._public_plan,
+      })
+      cls._record_class = type('%sRecord' % cls.__name__, (Record,), attrs)
+      # (plan, loads its related objects as records) for `load_record`
+      cls._record_plan = [
+          (plan, plan.setter is _function(Model.set) and
+           isinstance(plan.field_class, fields.RelatedField))
+          for plan in cls._plan
+      ]
+    return cls._record_class
+
+  def to_record(self):
+    record = self.record_class()()
+    for plan in self._plan:
+      setattr(record, plan.attr, getattr(self, plan.attr))
+    return record
+
+  @classmethod
+  def load_record(cls, data):
+    """
+      Validates the given data into a record instead of a model object.
+      Nested objects of related fields are loaded as records as well.
+    """
+    if not isinstance(data, dict):
+      raise Exception(
+          400, messages.VALIDATION_ERROR,
+          messages.INVALID_DATA_FORMAT.format('dict', type(data))
+      )
+    record = cls.record_class()()
+    errors = dict()
+    for plan, related in cls._record_plan:
+      value = data.get(plan.name)
+      if not value and value != 0:
+        value = data.get(plan.alias)
+      if isinstance(value, fields.Empty):
+        value = None
+      try:
+        if related:
+          setattr(record, plan.attr, cls._load_related_record(plan.field_class, value))
           continue
-        value = value.db_repr()
-      else:
-        if field is '_id':
-          field_class = getattr(self, '_pk')
-        else:
-          field_class = getattr(self, '_{}'.format(field))
-        if field_class.__module__ == self.__module__:
-          value = field_class.db_repr()
+        plan.setter(record, plan.attr, plan.field_class, value)
+      except Exception as ex:
+        errors[plan.error_key] = ex.args[2] if len(ex.args) >= 2 else ex.args[0]
+    if errors:
+      raise Exception(400, messages.VALIDATION_ERROR, errors)
+    return record
+
+  @classmethod
+  def load_records(cls, rows):
+    return [cls.load_record(row) for row in rows]
+
+  @staticmethod
+  def _load_related_record(field_class, value):
+    child = field_class.child
+    if value in field_class._null_types or not hasattr(child, 'load_record'):
+      return field_class.validate(value)
+    if not field_class.many:
+      if isinstance(value, dict):
+        return child.load_record(value)
+      return field_class.validate(value)
+    records = list()
+    errors = dict()
+    for index, item in enumerate(value):
+      try:
+        if isinstance(item, dict):
+          records.append(child.load_record(item))
         else:
-          value = field_class.db_repr(value)
-      dict_obj[field] = value
-    return dict_obj
-
-  def serialize(self):
-    dict_obj = dict()
-    for field in self.public_fields or self.fields:
-      if hasattr(self, 'serialize_{}'.format(field)):
-        dict_obj[self.alias.get(field, field)] = getattr(self, 'serialize_{}'.format(field))()
+          records.append(field_class._validate_related_object(item))
+      except Exception as ex:
+        errors[index] = ex.args[2] if len(ex.args) >= 2 else ex.args[0]
+    if errors:
+      raise Exception(400, messages.VALIDATION_ERROR, errors)
+    return records
+
+  @classmethod
+  def token_fields(cls, _seen=None):
+    """
+      Returns the names and aliases of the fields which hold encoded object ids, including
+      the ones of related models, so request data can be decoded without trying every value.
+    """
+    if '_token_fields' in cls.__dict__:
+      return cls.__dict__['_token_fields']
+    seen = _seen if _seen is not None else set()
+    seen.add(cls)
+    names = set()
+    for field in cls.fields:
+      field_class = getattr(cls, 'pk' if field == '_id' else field, None)
+      if not isinstance(field_class, (fields.ObjectID, fields.RelatedField)):
         continue
-      value = getattr(self, field)
-      if hasattr(value, 'serialize'):
-        if '_id' in getattr(value, 'fields', []):
-          dict_obj[field] = value._pk.serialize(value.pk)
-          continue
-        value = value.serialize()
-      else:
-        if field is '_id':
-          field_class = getattr(self, '_pk')
-        else:
-          field_class = getattr(self, '_{}'.format(field))
-        if field_class.__module__ == self.__module__:
-          value = field_class.serialize()
+      names.update([field, cls.alias.get(field, field)])
+      if field == '_id':
+        names.add('pk')
+      child = getattr(field_class, 'child', None)
+      if child is not None and child.__class__ not in seen:
+        names.update(child.token_fields(seen))
+    if _seen is None:
+      cls._token_fields = frozenset(names)
+    return frozenset(names)
+
+  def bulk_serialize(self, objects):
+    """
+      Serializes a list of objects. Datetime fields are converted column wise with
+      `utils.datetimes_to_millis` instead of one value at a time.
+    """
+    if self.__class__.serialize is not Model.serialize:
+      return [obj.serialize() for obj in objects]
+    columns = [
+        plan for plan in self._public_plan
+        if plan.serializer is None and isinstance(plan.field_class, fields.DateTime)
+    ]
+    rows = [obj.serialize(raw_fields=[plan.name for plan in columns]) for obj in objects]
+    for plan in columns:
+      field_class = plan.field_class
+      key = plan.key
+      indexes = []
+      for index, row in enumerate(rows):
+        if row[key] in field_class._null_types:
+          row[key] = field_class.serialize(row[key])
         else:
-          value = field_class.serialize(value)
-      dict_obj[self.alias.get(field, field)] = value
-    return dict_obj
+          indexes.append(index)
+      millis = utils.datetimes_to_millis([rows[index][key] for index in indexes])
+      for index, value in zip(indexes, millis):
+        rows[index][key] = int(value)
+    return rows
 
   def validate_db_fields(self):
     self.set_value(self.db_repr(), validate=True)
@@ -219,30 +510,170 @@ class Model(object):
 
   def create(self):
     self.validate_db_fields()
-    return self.manager.create(self)
+    result = self.manager.create(self)
+    self.manager.forget(self.pk)
+    return result
 
   def update(self):
-    self.validate_db_fields()
-    return self.manager.update(self)
-
-  def __getattribute__(self, attr):
-    value = object.__getattribute__(self, attr)
-    if attr not in object.__getattribute__(self, 'db_fields'):
-      return value
-    if not isinstance(value, fields.Empty):
-      return value
-    obj_id = object.__getattribute__(self, 'pk')
-    obj = object.__getattribute__(self, 'manager')._get_obj(obj_id)
+    """
+      Validates the object and saves it through `manager.update`. With `partial_updates`,
+      objects loaded from the database (or marked clean) validate and send only their changed
+      fields through `manager.update_fields`.
+    """
+    changed = self.changed_fields() if self.partial_updates else None
+    if changed is not None:
+      if not changed:
+        return None
+      result = self._partial_update(changed)
+    else:
+      self.validate_db_fields()
+      result = self.manager.update(self)
+    self.manager.forget(self.pk)
+    return result
+
+  @staticmethod
+  def validate_many(objs):
+    """
+      Validates every object, errors are collected by index like `RelatedField` does for many.
+    """
+    errors = dict()
+    for index, obj in enumerate(objs):
+      try:
+        obj.validate_db_fields()
+      except Exception as ex:
+        errors[index] = ex.args[2] if len(ex.args) > 2 else ex.args[0]
+    if errors:
+      raise Exception(400, messages.VALIDATION_ERROR, errors)
+
+  @classmethod
+  def bulk_create(cls, objs, chunk_size=None):
+    """
+      Validates and inserts the given objects in chunks of `chunk_size` (default
+      `manager.bulk_chunk_size`). Nothing is written if any of them is invalid.
+    """
+    objs = list(objs)
+    cls.validate_many(objs)
+    return cls.manager.bulk_create(objs, chunk_size=chunk_size)
+
+  @classmethod
+  def bulk_update(cls, objs, chunk_size=None):
+    """
+      Validates and updates the given objects in chunks of `chunk_size` (default
+      `manager.bulk_chunk_size`). Nothing is written if any of them is invalid.
+    """
+    objs = list(objs)
+    cls.validate_many(objs)
+    result = cls.manager.bulk_update(objs, chunk_size=chunk_size)
+    for obj in objs:
+      cls.manager.forget(obj.pk)
+    return result
+
+  def _defer(self, attr):
+    self.__dict__.pop(attr, None)
+    if '_deferred' not in self.__dict__:
+      self.__dict__['_deferred'] = set()
+      loaders.get_loader().add(self)
+    self.__dict__['_deferred'].add(attr)
+
+  def is_deferred(self, attr=None):
+    deferred = self.__dict__.get('_deferred')
+    return deferred is not None and (attr is None or attr in deferred)
+
+  def _load_deferred(self, attr=None):
+    """
+      Loads the object from the database when a deferred field is accessed, only the load
+      group of the field if the model declares load groups. Other deferred objects of the same
+      manager are loaded in the same query by the batch loader.
+    """
+    plans, projection = self._load_groups.get(attr, (None, None))
+    obj_id = self.pk
+    obj = loaders.get_loader().load(self, plans, projection)
     if not obj:
-      field_class = object.__getattribute__(self, '_pk')
       raise Exception(
           400, messages.VALIDATION_ERROR,
           {'_id': messages.INVALID_OBJECT_ID.format(
-              field_class.serialize(obj_id)
+              self._pk.serialize(obj_id)
           )}
       )
-    object.__getattribute__(self, 'set_value')(obj)
-    return object.__getattribute__(self, attr)
+    self._load_document(obj, plans)
+
+  def _load_document(self, document, plans=None):
+    """
+      Populates the object from a database document, or only the given plans from a partial
+      document. Fields assigned since the object was deferred are kept.
+    """
+    if plans is None:
+      self.__dict__.pop('_deferred', None)
+      self.set_value(document)
+      self.mark_clean(document)
+      return
+    deferred = self.__dict__.get('_deferred', set())
+    plans = [plan for plan in plans if plan.attr in deferred and plan.attr not in self.__dict__]
+    for plan in plans:
+      deferred.discard(plan.attr)
+      value = document.get(plan.name)
+      if not value and value != 0:
+        value = document.get(plan.alias)
+      plan.setter(self, plan.attr, plan.field_class, value)
+    if not deferred:
+      self.__dict__.pop('_deferred', None)
+    self.mark_clean(document, plans)
+
+  def mark_clean(self, document=None, plans=None):
+    """
+      Remembers the stored state of the object (the given database document or the current
+      `db_repr`), `update()` then validates and writes only the fields changed since.
+      Objects loaded through the manager are marked clean automatically.
+    """
+    if document is None:
+      document = self.db_repr()
+    if plans is None:
+      plans = self._plan
+      snapshot = self.__dict__['_snapshot'] = dict()
+    else:
+      snapshot = self.__dict__.setdefault('_snapshot', dict())
+    for plan in plans:
+      value = document.get(plan.name)
+      if isinstance(value, (dict, list)):
+        # nested values can be changed in place
+        value = copy.deepcopy(value)
+      snapshot[plan.name] = value
+
+  def changed_fields(self):
+    """
+      Returns the plans of the fields changed since the object was marked clean, or None if
+      the object is not tracked.
+    """
+    snapshot = self.__dict__.get('_snapshot')
+    if snapshot is None:
+      return None
+    # fields still deferred are unchanged and are not loaded just to be compared
+    deferred = self.__dict__.get('_deferred', ())
+    plans = [
+        plan for plan in self._plan
+        if plan.attr != 'pk' and (plan.attr not in deferred or plan.attr in self.__dict__)
+    ]
+    current = db_repr_fields(self, plans)
+    return [plan for plan in plans if current[plan.name] != snapshot.get(plan.name)]
+
+  def _partial_update(self, changed):
+    errors = dict()
+    for plan, value in zip(changed, db_repr_fields(self, changed).values()):
+      try:
+        plan.setter(self, plan.attr, plan.field_class, value)
+      except Exception as ex:
+        errors[plan.error_key] = ex.args[2] if len(ex.args) > 2 else ex.args[0]
+    if errors:
+      raise Exception(400, messages.VALIDATION_ERROR, errors)
+    self.validate_object()
+
+    # cleared fields are stored as null, like the full document written by `manager.update`
+    document = db_repr_fields(self, changed)
+    result = self.manager.update_fields(self.pk, {'$set': document})
+    snapshot = self.__dict__['_snapshot']
+    for name, value in list(document.items()):
+      snapshot[name] = copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+    return result
 
   def __getitem__(self, attr):
     if attr == '_id':
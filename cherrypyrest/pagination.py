@@ -0,0 +1,94 @@
+"""
+  Created on Oct 18 2026
+"""
+from builtins import int
+from builtins import object
+from builtins import str
+import base64
+import datetime as datetime_lib
+
+from bson import BSON
+from bson.objectid import ObjectId
+
+from . import messages
+from .utils import seal
+from .utils import unseal
+
+
+# types a cursor value can have, anything else (ex: an operator dict) is rejected
+CURSOR_VALUE_TYPES = (type(None), bool, int, float, str, ObjectId, datetime_lib.datetime)
+
+
+class Page(object):
+  """
+    One page of a keyset paginated list. `next_cursor` is None on the last page.
+  """
+  __slots__ = ('items', 'next_cursor')
+
+  def __init__(self, items, next_cursor=None):
+    self.items = items
+    self.next_cursor = next_cursor
+
+
+def normalize_sorting(sorting):
+  """
+    Converts `ListAPI.sorting` ('field', '-field' or (field, direction) entries) into a mongo
+    sort list ending with `_id`, which makes the order total.
+  """
+  sort = list()
+  for entry in sorting:
+    if isinstance(entry, (list, tuple)):
+      field, direction = entry
+    elif entry.startswith('-'):
+      field, direction = entry[1:], -1
+    else:
+      field, direction = entry, 1
+    if field != '_id':
+      sort.append((field, direction))
+  sort.append(('_id', sort[-1][1] if sort else 1))
+  return sort
+
+
+def encode_cursor(item, sort):
+  """
+    Returns the opaque cursor pointing after `item` (a document or a model object). The sort
+    values are encrypted and authenticated, clients can neither read nor forge them.
+  """
+  values = [item.get(field) for field, _ in sort]
+  return base64.urlsafe_b64encode(seal(BSON.encode({'v': values}))).decode('ascii')
+
+
+def decode_cursor(cursor, sort):
+  try:
+    values = BSON(unseal(base64.urlsafe_b64decode(str(cursor)))).decode()['v']
+  except Exception:
+    values = None
+  if (not isinstance(values, list) or len(values) != len(sort) or
+      not all(isinstance(value, CURSOR_VALUE_TYPES) for value in values)):
+    raise Exception(400, messages.VALIDATION_ERROR, {'cursor': messages.INVALID_CURSOR})
+  return values
+
+
+def keyset_filter(values, sort):
+  """
+    Returns the range filter selecting the documents after the given sort values, ex: for
+    [('name', 1), ('_id', 1)]: {'$or': [{'name': {'$gt': n}}, {'name': n, '_id': {'$gt': i}}]}
+    Null and missing values sort first in ascending and last in descending order, as in mongo,
+    where range operators never match them.
+  """
+  clauses = list()
+  for position, (field, direction) in enumerate(sort):
+    value = values[position]
+    if value is None:
+      if direction < 0:
+        # nothing sorts after null in descending order
+        continue
+      after = {field: {'$ne': None}}
+    elif direction > 0:
+      after = {field: {'$gt': value}}
+    else:
+      after = {'$or': [{field: {'$lt': value}}, {field: None}]}
+    clause = dict((sort[index][0], values[index]) for index in range(position))
+    clause.update(after)
+    clauses.append(clause)
+  return clauses[0] if len(clauses) == 1 else {'$or': clauses}
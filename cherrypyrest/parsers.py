@@ -0,0 +1,182 @@
+"""
+  Created on Oct 18 2026
+"""
+from builtins import object
+import codecs
+import re
+
+import simplejson
+
+from . import messages
+
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+
+# orjson is used when installed (pip install cherrypyrest[fast]), it raises ValueError
+# subclasses on invalid json like simplejson
+loads = orjson.loads if orjson is not None else simplejson.loads
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _too_large(max_size):
+  return Exception(413, messages.REQUEST_TOO_LARGE.format(max_size))
+
+
+def iter_body(request, max_size=None, chunk_size=CHUNK_SIZE):
+  """
+    Yields the request body in chunks. Bodies declaring a Content-Length above `max_size` are
+    rejected before anything is read, others as soon as they grow past it.
+  """
+  length = request.headers.get('Content-Length')
+  if length is not None:
+    length = int(length)
+    if max_size is not None and length > max_size:
+      raise _too_large(max_size)
+  remaining = length
+  size = 0
+  while remaining is None or remaining > 0:
+    chunk = request.body.read(chunk_size if remaining is None else min(chunk_size, remaining))
+    if not chunk:
+      break
+    size += len(chunk)
+    if max_size is not None and size > max_size:
+      raise _too_large(max_size)
+    if remaining is not None:
+      remaining -= len(chunk)
+    yield chunk
+
+
+def read_body(request, max_size=None):
+  return b''.join(iter_body(request, max_size))
+
+
+def _skip_whitespace(text, position):
+  while position < len(text) and text[position] in ' \t\r\n':
+    position += 1
+  return position
+
+
+# a whole string or a structural character of json text, commas only matter at the top level
+_STRING = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+_TOP_LEVEL_TOKEN = re.compile(_STRING + r'|["\[\]{},]')
+_NESTED_TOKEN = re.compile(_STRING + r'|["\[\]{}]')
+# the rest of a string up to (not including) its closing quote or a trailing backslash
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+
+
+class _ArrayScanner(object):
+  """
+    Splits a top level json array into the text of its items while it is received. Strings
+    and nesting depth are tracked incrementally, so every character is scanned once and an
+    item is decoded only when the delimiter closing it at the top level has arrived.
+  """
+
+  def __init__(self):
+    self.started = False
+    self.done = False
+    self.depth = 0
+    self.in_string = False
+    self.escape = False
+    self.in_item = False
+    self.expect_value = False
+    self.pieces = []
+
+  def _item_end(self, text, start, end):
+    self.pieces.append(text[start:end])
+    item = loads(''.join(self.pieces))
+    self.pieces = []
+    self.in_item = False
+    return item
+
+  def feed(self, text):
+    items = []
+    position = 0
+    length = len(text)
+    start = 0 if self.in_item else None
+    while position < length:
+      if self.done:
+        if _skip_whitespace(text, position) < length:
+          raise ValueError('Extra data after the json array')
+        break
+      if not self.started:
+        position = _skip_whitespace(text, position)
+        if position == length:
+          break
+        if text[position] != '[':
+          raise ValueError('A json array is required')
+        self.started = True
+        position += 1
+        continue
+      if self.in_string:
+        if self.escape:
+          self.escape = False
+          position += 1
+          continue
+        end = _STRING_BODY.match(text, position).end()
+        if end < length and text[end] == '"':
+          self.in_string = False
+        elif end < length:
+          # a backslash ending the chunk escapes the first character of the next one
+          self.escape = True
+        position = end + 1
+        continue
+      match = (_NESTED_TOKEN if self.depth else _TOP_LEVEL_TOKEN).search(text, position)
+      index = match.start() if match is not None else length
+      if start is None:
+        begin = _skip_whitespace(text, position)
+        if begin < index:
+          start = begin
+          self.in_item = True
+      if match is None:
+        break
+      char = match.group()[0]
+      position = match.end()
+      if char in '"[{':
+        if start is None:
+          start = index
+          self.in_item = True
+        if char == '[' or char == '{':
+          self.depth += 1
+        elif position - index == 1:
+          # the string continues in the next chunk
+          self.in_string = True
+      elif self.depth > 0:
+        if char != ',':
+          self.depth -= 1
+      elif char == '}':
+        raise ValueError('Unexpected \'}}\' at position {}'.format(index))
+      elif start is not None:
+        items.append(self._item_end(text, start, index))
+        start = None
+        self.expect_value = char == ','
+        self.done = char == ']'
+      elif char == ',' or self.expect_value:
+        raise ValueError('Expecting value at position {}'.format(index))
+      else:
+        self.done = True
+    if start is not None:
+      self.pieces.append(text[start:])
+    return items
+
+  def close(self):
+    if not self.done:
+      raise ValueError('Unterminated json array')
+
+
+def iter_array_items(chunks):
+  """
+    Incrementally decodes a top level json array from an iterable of byte chunks and yields
+    its items as soon as they are complete, so only one item is held in memory at a time.
+  """
+  text_decoder = codecs.getincrementaldecoder('utf-8')()
+  scanner = _ArrayScanner()
+  for chunk in chunks:
+    for item in scanner.feed(text_decoder.decode(chunk)):
+      yield item
+  for item in scanner.feed(text_decoder.decode(b'', True)):
+    yield item
+  scanner.close()
@@ -0,0 +1,224 @@
+"""
+  Created on Oct 18 2026
+"""
+from builtins import object
+import os
+import threading
+import time
+
+import cherrypy
+
+
+class PoolTimeout(Exception):
+  pass
+
+
+class _ThreadState(threading.local):
+  # class level defaults, a getattr default on a missing thread local attribute raises internally
+  client = None
+  scopes = 0
+
+
+class ClientPool(object):
+  """
+    Bounded pool of database clients shared by all managers.
+
+    A thread checks out one client and keeps it until it is released, at the end of the
+    cherrypy request or when a `borrow()` block exits. Outside of both the client is returned
+    to the pool right away, so no thread can hold one for its whole life. Clients idle for
+    longer than `idle_timeout` seconds are closed, clients leased by dead threads are reclaimed,
+    a checkout waiting more than `wait_timeout` seconds raises PoolTimeout and the pool is reset
+    in a forked child process.
+  """
+
+  def __init__(self, factory=dict, max_size=10, idle_timeout=300, wait_timeout=30):
+    self.factory = factory
+    self.max_size = max_size
+    self.idle_timeout = idle_timeout
+    self.wait_timeout = wait_timeout
+    self._reset()
+    if hasattr(os, 'register_at_fork'):
+      os.register_at_fork(after_in_child=self._reset)
+
+  def _reset(self):
+    # clients of the parent process are dropped without closing them
+    self._pid = os.getpid()
+    self._cond = threading.Condition(threading.Lock())
+    self._local = _ThreadState()
+    self._idle = []
+    # thread -> client. Keyed by the thread object, idents are reused once a thread exits
+    self._leases = dict()
+    self._created = 0
+    self._waits = 0
+    self._wait_time = 0.0
+    self._max_wait_time = 0.0
+
+  def configure(self, **kwargs):
+    """
+      Updates `factory`, `max_size`, `idle_timeout` or `wait_timeout`. Existing clients are
+      closed so the new factory is used from now on.
+    """
+    with self._cond:
+      for key, value in list(kwargs.items()):
+        if key not in ('factory', 'max_size', 'idle_timeout', 'wait_timeout'):
+          raise AttributeError(key)
+        setattr(self, key, value)
+      idle, self._idle = self._idle, []
+      self._created -= len(idle)
+      self._cond.notify_all()
+    for client, _ in idle:
+      self._close(client)
+
+  @staticmethod
+  def _close(client):
+    if hasattr(client, 'close'):
+      client.close()
+
+  def _evict_idle(self, now):
+    expired = [client for client, since in self._idle if now - since > self.idle_timeout]
+    if expired:
+      self._idle = [(client, since) for client, since in self._idle if now - since <= self.idle_timeout]
+      self._created -= len(expired)
+    return expired
+
+  def _reclaim_dead_leases(self):
+    for thread, client in list(self._leases.items()):
+      if not thread.is_alive():
+        del self._leases[thread]
+        self._idle.append((client, time.time()))
+
+  def checkout(self):
+    """
+      Returns a client, waiting for one to be checked in if the pool is exhausted.
+    """
+    if os.getpid() != self._pid:
+      self._reset()
+    started = time.time()
+    waited = False
+    expired = []
+    with self._cond:
+      while True:
+        expired.extend(self._evict_idle(time.time()))
+        if self._idle:
+          client = self._idle.pop()[0]
+          break
+        if self._created < self.max_size:
+          self._created += 1
+          client = None
+          break
+        self._reclaim_dead_leases()
+        if self._idle:
+          continue
+        remaining = None
+        if self.wait_timeout is not None:
+          remaining = self.wait_timeout - (time.time() - started)
+          if remaining <= 0:
+            raise PoolTimeout('No database client available in the pool')
+        waited = True
+        self._cond.wait(remaining)
+      if waited:
+        wait_time = time.time() - started
+        self._waits += 1
+        self._wait_time += wait_time
+        self._max_wait_time = max(self._max_wait_time, wait_time)
+    for expired_client in expired:
+      self._close(expired_client)
+    if client is None:
+      try:
+        client = self.factory()
+      except Exception:
+        with self._cond:
+          self._created -= 1
+          self._cond.notify()
+        raise
+    return client
+
+  def checkin(self, client):
+    with self._cond:
+      self._idle.append((client, time.time()))
+      self._cond.notify()
+
+  def acquire(self):
+    """
+      Returns the client leased by the current thread, checking one out if needed.
+      Inside a cherrypy request the client is leased until the request ends. Outside of a
+      request it is leased until the `borrow()` block or the `run_operation` call ends, and
+      checked in again at once out of them. Managers call their methods with `run_operation`.
+    """
+    client = self._local.client
+    if client is not None and os.getpid() == self._pid:
+      return client
+    client = self.checkout()
+    request = cherrypy.serving.request
+    if request.app is None and not self._local.scopes:
+      self.checkin(client)
+      return client
+    self._local.client = client
+    with self._cond:
+      self._leases[threading.current_thread()] = client
+    if request.app is not None:
+      request.hooks.attach('on_end_request', self.release)
+    return client
+
+  def release(self):
+    client = self._local.client
+    if client is None:
+      return
+    self._local.client = None
+    with self._cond:
+      self._leases.pop(threading.current_thread(), None)
+    self.checkin(client)
+
+  def borrow(self):
+    return _Lease(self)
+
+  def run_operation(self, func, *args, **kwargs):
+    """
+      Calls `func`, a client it acquires outside of a request stays leased until it returns.
+      A call which does not reach the database costs no checkout.
+    """
+    local = self._local
+    leased = local.client is not None
+    local.scopes += 1
+    try:
+      return func(*args, **kwargs)
+    finally:
+      local.scopes -= 1
+      if not leased and cherrypy.serving.request.app is None:
+        self.release()
+
+  def stats(self):
+    with self._cond:
+      return {
+          'in_use': self._created - len(self._idle),
+          'idle': len(self._idle),
+          'size': self._created,
+          'max_size': self.max_size,
+          'waits': self._waits,
+          'wait_time': self._wait_time,
+          'max_wait_time': self._max_wait_time,
+      }
+
+
+class _Lease(object):
+
+  def __init__(self, pool):
+    self.pool = pool
+    self.nested = False
+
+  def __enter__(self):
+    local = self.pool._local
+    self.nested = local.client is not None
+    local.scopes += 1
+    try:
+      return self.pool.acquire()
+    except Exception:
+      local.scopes -= 1
+      raise
+
+  def __exit__(self, *exc_info):
+    self.pool._local.scopes -= 1
+    if not self.nested:
+      self.pool.release()
+    return False
+
@@ -6,16 +6,32 @@ from __future__ import print_function
 from builtins import str
 from builtins import object
 import datetime as datetime_lib
-import traceback
 
 import cherrypy
-import simplejson
 from bson.objectid import ObjectId
 
 from . import messages
+from . import parsers
+from .context import ContextAttribute
+from .context import get_context
+from .context import new_context
+from .encoders import dumps
+from .encoders import encoded_by_json_out
+from .etags import NOT_MODIFIED
+from .etags import etag_matches
+from .etags import make_etag
+from .etags import version_validator
+from .error_log import log_server_error
 from .exceptions import APIException
+from .pagination import Page
+from .pagination import decode_cursor
+from .pagination import encode_cursor
+from .pagination import keyset_filter
+from .pagination import normalize_sorting
 from .utils import decode
+from .utils import decode_in_place
 from .utils import format_response
+from .utils import is_token
 from .utils import unicode_to_python_obj
 
 
@@ -28,6 +44,28 @@ class GenericAPI(object):
   manager = None
   permissions = []
   serializer = None
+  model = None
+  # request keys holding encoded object ids, see `get_token_params`
+  token_params = None
+  # stream list responses item by item, see `render_stream`
+  stream = False
+  stream_chunk_size = 100
+  # maximum size in bytes of POST/PUT bodies, larger ones are rejected with 413
+  max_body_size = None
+  # pass the items of a top level json array body one by one, see `iter_request_items`
+  stream_request = False
+  # send an ETag with GET responses and answer 304 to a matching If-None-Match
+  conditional = False
+  # field holding a version or an updated at datetime of the returned objects, used as etag
+  # instead of a hash of the response body
+  version_field = None
+
+  # per request state, kept on the request context so one instance serves all threads
+  request = ContextAttribute('request')
+  args = ContextAttribute('args')
+  kwargs = ContextAttribute('kwargs')
+  pk = ContextAttribute('pk')
+  object = ContextAttribute('object')
 
   def __init__(self, *args, **kwargs):
     """
@@ -51,75 +89,203 @@ class GenericAPI(object):
     if not method:
       raise APIException(400, messages.METHOD_NOT_AVAILABLE.format(
           cherrypy.request.method.upper()))
-    self.request = cherrypy.request
+    new_context(args, kwargs)
     self.request.user = cherrypy.request.cookie.get('user')
     self.request.account = cherrypy.request.cookie.get('account')
-    self.args = args
-    self.kwargs = kwargs
     try:
-      kwargs = self.pre_request_validation(*args, **kwargs)
-      resp = method(*args, **kwargs)
-    except UnicodeEncodeError:
-      print('unicode encode error')
-      print(traceback.format_exc())
-      raise APIException(400, messages.INVALID_INPUT_DATA, data={
-          "traceback": traceback.format_exc()
-      })
-    except UnicodeDecodeError:
-      print('unicode decode error')
-      print(traceback.format_exc())
-      raise APIException(400, messages.INVALID_INPUT_DATA, data={
-          "traceback": traceback.format_exc()
-      })
+      resp = self.call_handler(method, *args, **kwargs)
+    except (UnicodeEncodeError, UnicodeDecodeError):
+      raise APIException(400, messages.INVALID_INPUT_DATA)
     except ValueError as ex:
-      print('value error')
-      print(traceback.format_exc())
-      raise APIException(400, messages.INVALID_DATA.format(str(ex)), {
-          "traceback": traceback.format_exc()
-      })
+      raise APIException(400, messages.INVALID_DATA.format(str(ex)))
     except KeyError as ex:
-      print('key error')
-      print(traceback.format_exc())
-      raise APIException(500, messages.KEY_ERROR.format(str(ex)), {
-          "traceback": traceback.format_exc()
-      })
+      message = messages.KEY_ERROR.format(str(ex))
+      raise APIException(500, message, data={'traceback': log_server_error(message)})
     except Exception as ex:
-      status_code = 500
-      message = 'Internal Server Error. Actual exception was: {}'.format(str(ex))
-      data = {'traceback': traceback.format_exc()}
-      if len(ex.args) > 0 and isinstance(ex.args[0], int):
-        status_code = ex.args[0]
-      if len(ex.args) > 1 and isinstance(ex.args[1], (str, str)):
-        message = str(ex.args[1])
-      if len(ex.args) > 2 and isinstance(ex.args[2], dict):
-        data = ex.args[2]
-      # else:
-      #   data = 
-      raise APIException(status_code, message, data=data)
+      raise self.to_api_exception(ex)
+    if resp is NOT_MODIFIED:
+      return self.not_modified(self.context.etag)
     self.finalize_response(resp)
-    format_response(resp)
-    return {
+    extra = dict()
+    if isinstance(resp, Page):
+      extra['next_cursor'] = resp.next_cursor
+      resp = resp.items
+    if self.stream and not isinstance(resp, dict):
+      return self.render_stream(resp, extra)
+    envelope = {
         'success': resp.get('success', True) if isinstance(resp, dict) else True,
         'message': resp.get('message', True) if isinstance(resp, dict) else "success",
         'data': resp
     }
+    envelope.update(extra)
+    if not self.conditional or cherrypy.request.method.upper() != 'GET':
+      return self.render(envelope)
+    return self.render_conditional(envelope, resp, extra)
+
+  @property
+  def context(self):
+    """
+      The `RequestContext` of the current request. `request`, `args`, `kwargs`, `pk` and
+      `object` of the api are read from and written to it, attach any other per request
+      state to the context instead of the api instance.
+    """
+    return get_context()
+
+  @staticmethod
+  def to_api_exception(ex):
+    """
+      Converts an exception raised by a handler, ex: Exception(400, message, data).
+      Client errors (4xx) never format a traceback, the traceback of server errors is
+      formatted once and logged by the background error logger.
+    """
+    status_code = 500
+    message = None
+    data = None
+    if len(ex.args) > 0 and isinstance(ex.args[0], int):
+      status_code = ex.args[0]
+    if len(ex.args) > 1 and isinstance(ex.args[1], str):
+      message = str(ex.args[1])
+    if len(ex.args) > 2 and isinstance(ex.args[2], dict):
+      data = ex.args[2]
+    if message is None:
+      message = 'Internal Server Error. Actual exception was: {}'.format(str(ex))
+    if status_code >= 500:
+      trace = log_server_error(message)
+      if data is None:
+        data = {'traceback': trace}
+    return APIException(status_code, message, data=data or {})
+
+  def call_handler(self, method, *args, **kwargs):
+    """
+      Validates the request and calls the verb handler. Conditional GET requests whose
+      validator (see `get_validator`) matches If-None-Match skip the handler.
+    """
+    kwargs = self.pre_request_validation(*args, **kwargs)
+    if self.conditional and cherrypy.request.method.upper() == 'GET':
+      validator = self.get_validator(kwargs)
+      if validator is not None:
+        self.context.etag = make_etag(validator)
+        if self.etag_matches(self.context.etag):
+          return NOT_MODIFIED
+    return method(*args, **kwargs)
+
+  def get_validator(self, params):
+    """
+      Override to compute a cheap validator of the response before the handler runs, ex: the
+      updated at datetime of the requested object or (count, max updated at) of a list.
+      The etag is built from it and the handler is skipped when the client has it already.
+    """
+    return None
+
+  @staticmethod
+  def etag_matches(etag):
+    return etag_matches(etag, cherrypy.request.headers.get('If-None-Match'))
+
+  @staticmethod
+  def not_modified(etag):
+    response = cherrypy.response
+    response.status = 304
+    response.headers['ETag'] = etag
+    response.headers.pop('Content-Type', None)
+    return None if encoded_by_json_out() else b''
+
+  def render_conditional(self, envelope, resp, extra):
+    """
+      Renders a GET response with an ETag from the validator, the `version_field` of the
+      returned objects or a hash of the body. A matching If-None-Match gets a 304 without
+      encoding the response when the etag is known before rendering.
+    """
+    etag = self.context.etag
+    if etag is None and self.version_field is not None:
+      validator = version_validator(resp, self.version_field)
+      if validator is not None:
+        etag = make_etag((validator, sorted(extra.items())))
+    if etag is not None and self.etag_matches(etag):
+      return self.not_modified(etag)
+    body = self.render(envelope)
+    if etag is None:
+      etag = make_etag(body if isinstance(body, bytes) else dumps(body))
+      if self.etag_matches(etag):
+        return self.not_modified(etag)
+    cherrypy.response.headers['ETag'] = etag
+    return body
 
   @staticmethod
-  def parse_request_data():
+  def render(resp):
+    """
+      Encodes the response envelope into json bytes in a single pass. When `tools.json_out`
+      is enabled with its default handler the envelope is returned as json serializable
+      values for the tool to encode, set `encoders.json_handler` as the tool handler to skip
+      this conversion.
+    """
+    if encoded_by_json_out():
+      return format_response(resp)
+    cherrypy.response.headers['Content-Type'] = 'application/json'
+    return dumps(resp)
+
+  def render_stream(self, items, extra=None):
+    """
+      Streams the response envelope and encodes the items one chunk at a time, so any iterable
+      or database cursor can be sent without holding the whole list or its json in memory.
+      `extra` keys (ex: next_cursor) are added to the envelope after the data.
+    """
+    if encoded_by_json_out():
+      # the default json_out handler cannot encode a generator
+      envelope = {'success': True, 'message': 'success', 'data': list(items)}
+      envelope.update(extra or dict())
+      return self.render(envelope)
+    cherrypy.response.stream = True
+    cherrypy.response.headers['Content-Type'] = 'application/json'
+    return self._stream_items(items, extra or dict())
+
+  def _stream_items(self, items, extra):
+    yield b'{"success":true,"message":"success","data":['
+    chunk = []
+    separator = b''
+    for item in items:
+      chunk.append(dumps(item))
+      if len(chunk) >= self.stream_chunk_size:
+        yield separator + b','.join(chunk)
+        separator = b','
+        chunk = []
+    if chunk:
+      yield separator + b','.join(chunk)
+    yield b']' + b''.join(
+        b',' + dumps(key) + b':' + dumps(value) for key, value in list(extra.items())
+    ) + b'}'
+
+  def parse_request_data(self):
     """
       Cherry doesn't provide support for handling content-type application/json' in post
       or put requests. So this method extract data from cherrypy request and  converts it into json.
+      Bodies larger than `max_body_size` are rejected with 413 before being parsed.
     """
-    try:
-      cl = cherrypy.request.headers['Content-Length']
-      rawbody = cherrypy.request.body.read(int(cl))
-      return simplejson.loads(rawbody)
-    except APIException as ex:
-      raise APIException(400, messages.INVALID_DATA.format(str(ex)))
-    # return cherrypy.request.json
+    return parsers.loads(parsers.read_body(cherrypy.request, self.max_body_size))
+
+  def iter_request_items(self):
+    """
+      Yields the items of a top level json array body as they are received and decoded, so
+      handlers can validate and persist a large body item by item.
+    """
+    return parsers.iter_array_items(parsers.iter_body(cherrypy.request, self.max_body_size))
+
+  def get_token_params(self):
+    """
+      Collects the request keys that hold encoded object ids from `token_params` and the
+      `model` declaration. Returns None when neither is declared, in which case every value
+      in the request is tried as an object id.
+    """
+    if self.token_params is None and self.model is None:
+      return None
+    keys = set(self.token_params or [])
+    if self.model is not None:
+      keys.update(self.model.token_fields())
+    return keys
 
   def get_object_id_from_url(self):
     for obj in self.args:
+      if not is_token(obj):
+        continue
       try:
         return ObjectId(decode(obj))
       except:
@@ -131,19 +297,29 @@ class GenericAPI(object):
       Performs data validation and permission check before handling request to actual api endpoint.
     """
     self.pk = self.get_object_id_from_url()
+    self.check_permissions(*args, **kwargs)
+    return self.get_request_params(kwargs)
 
+  def check_permissions(self, *args, **kwargs):
     # Excetue all permissions in the controller
     for permission in self.permissions:
       permission(self, *args, **kwargs).has_permission()
 
+  def get_request_params(self, kwargs):
+    """
+      Returns the query params (GET) or the parsed body (POST/PUT) of the request.
+    """
     data = dict()
+    token_keys = self.get_token_params()
     if cherrypy.request.method.upper() == 'GET':
-      return unicode_to_python_obj(kwargs)
+      return unicode_to_python_obj(kwargs, token_keys)
       # params = self.serializer.validate_params(kwargs)
     if 'apis/files/' in cherrypy.request.path_info:
-      return unicode_to_python_obj(kwargs)
+      return unicode_to_python_obj(kwargs, token_keys)
     if cherrypy.request.method.upper() in ['POST', 'PUT']:
-      return unicode_to_python_obj(self.parse_request_data())
+      if self.stream_request:
+        return {'items': (decode_in_place(item, token_keys) for item in self.iter_request_items())}
+      return decode_in_place(self.parse_request_data(), token_keys)
     return data
 
   @staticmethod
@@ -157,9 +333,18 @@ class GenericAPI(object):
 class ListAPI(GenericAPI):
   """
     Provides functionality for listing of obejcts.
+    Set `stream = True` to send the objects returned by `get_queryset` (a list, an iterator or a
+    database cursor) as a chunked response.
+    Set `paginate = True` for keyset pagination: the list is ordered by `sorting` plus `_id`,
+    the `limit` and `cursor` params select the page and `next_cursor` is added to the response.
   """
   search_params = []
+  # 'field', '-field' or (field, direction) entries
   sorting = []
+  conditional = True
+  paginate = False
+  page_size = 50
+  max_page_size = 500
 
   def get_queryset(self, params):
     """
@@ -168,11 +353,64 @@ class ListAPI(GenericAPI):
     raise APIException(
         500, messages.METHOD_NOT_IMPLEMENTED.format('get_queryset'))
 
+  def get_limit(self, params):
+    limit = params.pop('limit', None)
+    if limit is None:
+      return self.page_size
+    try:
+      limit = int(limit)
+    except (TypeError, ValueError):
+      limit = 0
+    if not 0 < limit <= self.max_page_size:
+      raise Exception(400, messages.VALIDATION_ERROR, {
+          'limit': messages.INVALID_LIMIT.format(self.max_page_size)
+      })
+    return limit
+
+  def get_filter(self, params):
+    """
+      Returns the mongo filter of a paginated list, by default equality on the `search_params`
+      present in the request.
+    """
+    return dict((key, params[key]) for key in self.search_params if key in params)
+
+  def get_page(self, params, keyset, sort, limit):
+    """
+      Returns up to `limit` objects (documents or model objects) after the cursor. `keyset` is
+      the range filter built from the cursor, None on the first page. Override it to fetch
+      the page some other way than `manager.find_page`.
+    """
+    query = self.get_filter(params)
+    if keyset:
+      query = {'$and': [query, keyset]} if query else keyset
+    return self.manager.find_page(query, sort, limit)
+
+  def paginate_queryset(self, params):
+    sort = normalize_sorting(self.sorting)
+    limit = self.get_limit(params)
+    cursor = params.pop('cursor', None)
+    keyset = keyset_filter(decode_cursor(cursor, sort), sort) if cursor else None
+    # one extra object tells whether there is a next page
+    return self.build_page(self.get_page(params, keyset, sort, limit + 1), sort, limit)
+
+  def build_page(self, items, sort, limit):
+    """
+      Returns the `Page` of the first `limit` of the fetched items.
+    """
+    items = list(items)
+    next_cursor = None
+    if len(items) > limit:
+      items = items[:limit]
+      next_cursor = encode_cursor(items[-1], sort)
+    return Page(items, next_cursor)
+
   def GET(self, *args, **kwargs):
     """
       performs operations used in getting list of objects
     """
     self.args = args
+    if self.paginate:
+      return self.paginate_queryset(kwargs)
     return self.get_queryset(kwargs)
 
 
@@ -200,6 +438,7 @@ class RetrieveAPI(GenericAPI):
   """
     This API retrieves an object from the database based on the user permissions
   """
+  conditional = True
 
   def get_object(self):
     """
@@ -0,0 +1,170 @@
+"""
+  Created on Oct 18 2026
+"""
+from builtins import object
+import re
+
+import cherrypy
+
+
+_METACHARS = '.^$*+?{}[]\\|()'
+_QUANTIFIERS = '*+?{'
+
+
+def _has_top_level_alternation(pattern):
+  depth = 0
+  in_class = False
+  escaped = False
+  for char in pattern:
+    if escaped:
+      escaped = False
+    elif char == '\\':
+      escaped = True
+    elif in_class:
+      in_class = char != ']'
+    elif char == '[':
+      in_class = True
+    elif char == '(':
+      depth += 1
+    elif char == ')':
+      depth -= 1
+    elif char == '|' and depth == 0:
+      return True
+  return False
+
+
+def literal_segments(regex):
+  """
+    Returns the path segments every match of the regex starts with, ex: ['apis', 'users'] for
+    r'^apis/users/(?P<pk>\\w+)/$'. Only whole segments (followed by '/') are returned.
+  """
+  pattern = regex.pattern
+  if regex.flags & (re.IGNORECASE | re.VERBOSE) or _has_top_level_alternation(pattern):
+    return []
+  if pattern.startswith('^'):
+    pattern = pattern[1:]
+  literal = []
+  index = 0
+  while index < len(pattern):
+    char = pattern[index]
+    if char == '\\':
+      if index + 1 < len(pattern) and not pattern[index + 1].isalnum():
+        literal.append(pattern[index + 1])
+        index += 2
+        continue
+      break
+    if char in _METACHARS:
+      if char in _QUANTIFIERS and literal:
+        # the quantifier applies to the last literal character
+        literal.pop()
+      break
+    literal.append(char)
+    index += 1
+  return ''.join(literal).split('/')[:-1]
+
+
+class Route(object):
+  __slots__ = ('order', 'regex', 'api', 'kwargs', 'positional', 'named')
+
+  def __init__(self, order, regex, api, kwargs):
+    self.order = order
+    self.regex = regex
+    self.api = api
+    self.kwargs = kwargs
+    named = dict((index, name) for name, index in list(regex.groupindex.items()))
+    self.positional = [index for index in range(1, regex.groups + 1) if index not in named]
+    self.named = list(named.items())
+
+  def resolve(self, match):
+    args = tuple(match.group(index) for index in self.positional)
+    kwargs = dict(self.kwargs)
+    for index, name in self.named:
+      kwargs[name] = match.group(index)
+    return self.api, args, kwargs
+
+
+class _Node(object):
+  __slots__ = ('children', 'routes')
+
+  def __init__(self):
+    self.children = dict()
+    self.routes = []
+
+
+class Router(object):
+  """
+    Matches a path against a table of `utils.url(regex, api, kwargs)` entries with the
+    semantics of trying them in order with `regex.match`, without trying every route: the
+    routes are indexed in a trie by the literal path segments their regex starts with, so
+    only the routes whose literal prefix matches the path are tried, still in table order.
+
+    `match(path)` returns (api, args, kwargs) or None: unnamed groups are passed as args,
+    named groups are added to the kwargs of the route.
+  """
+
+  def __init__(self, urls):
+    self.routes = [Route(order, *entry) for order, entry in enumerate(urls)]
+    self._root = _Node()
+    for route in self.routes:
+      node = self._root
+      for segment in literal_segments(route.regex):
+        node = node.children.setdefault(segment, _Node())
+      node.routes.append(route)
+    self._inherit(self._root, [])
+
+  def _inherit(self, node, inherited):
+    # every node keeps the routes of its ancestors too, in table order
+    node.routes = sorted(inherited + node.routes, key=lambda route: route.order)
+    for child in list(node.children.values()):
+      self._inherit(child, node.routes)
+
+  def candidates(self, path):
+    node = self._root
+    for segment in path.split('/')[:-1]:
+      child = node.children.get(segment)
+      if child is None:
+        break
+      node = child
+    return node.routes
+
+  def match(self, path):
+    for route in self.candidates(path):
+      match = route.regex.match(path)
+      if match is not None:
+        return route.resolve(match)
+    return None
+
+
+class RouteDispatcher(object):
+  """
+    CherryPy dispatcher for a url table, ex:
+
+      urls = [url(r'^apis/users/$', UserListAPI()), url(r'^apis/users/(?P<pk>\\w+)/$', UserAPI())]
+      cherrypy.tree.mount(None, '/', {'/': {'request.dispatch': RouteDispatcher(urls)}})
+
+    The `default` method of the matched api is called with the route args and kwargs merged
+    with the request params. Unmatched paths are 404.
+  """
+
+  def __init__(self, urls, strip='/'):
+    self.router = urls if isinstance(urls, Router) else Router(urls)
+    self.strip = strip
+
+  def __call__(self, path_info):
+    request = cherrypy.serving.request
+    found = self.router.match(path_info.lstrip(self.strip) if self.strip else path_info)
+    config = cherrypy.config.copy()
+    app = request.app
+    if hasattr(app.root, '_cp_config'):
+      config.update(app.root._cp_config)
+    config.update(app.config.get('/', {}))
+    if found is None:
+      request.config = config
+      request.handler = cherrypy.NotFound()
+      return
+    api, args, kwargs = found
+    if hasattr(api, '_cp_config'):
+      config.update(api._cp_config)
+    request.config = config
+    request.handler = cherrypy.dispatch.LateParamPageHandler(
+        getattr(api, 'default', api), *args, **kwargs)
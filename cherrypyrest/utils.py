@@ -10,15 +10,25 @@ from past.utils import old_div
 import urllib.request, urllib.parse, urllib.error
 import base64
 import datetime as datetime_lib
+import hashlib
+import hmac
 import re
 from os import getenv
 from threading import Lock
+from threading import local
+from collections import OrderedDict
 import binascii
 
 import pytz
 from Crypto.Cipher import AES
+from dateutil import parser as dt_parser
 from bson.objectid import ObjectId
 
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
 
 # SECRET = None
 SECRET = "1234567890123455"
@@ -42,7 +52,37 @@ def _init():
 def get_cipher_instance():
   if not SECRET:
     _init()
-  return AES.new(SECRET, AES.MODE_ECB)
+  return AES.new(to_bytes(SECRET), AES.MODE_ECB)
+
+
+def seal(data):
+  """
+    Encrypts and authenticates bytes with the secret (AES EAX). Returns nonce + tag + data.
+    The nonce is a HMAC of the data, so the same data is always sealed to the same bytes
+    (ex: the cursors of a page stay the same and so does its ETag).
+  """
+  if not SECRET:
+    _init()
+  nonce = hmac.new(to_bytes(SECRET), b'seal:' + data, hashlib.sha256).digest()[:16]
+  cipher = AES.new(to_bytes(SECRET), AES.MODE_EAX, nonce=nonce)
+  ciphertext, tag = cipher.encrypt_and_digest(data)
+  return cipher.nonce + tag + ciphertext
+
+
+def unseal(data):
+  """
+    Returns the bytes sealed by `seal`, raises ValueError if they have been tampered with.
+  """
+  if not SECRET:
+    _init()
+  cipher = AES.new(to_bytes(SECRET), AES.MODE_EAX, nonce=data[:16])
+  return cipher.decrypt_and_verify(data[32:], data[16:32])
+
+
+def to_bytes(value):
+  if isinstance(value, bytes):
+    return value
+  return value.encode('utf-8')
 
 
 # def encode(value):
@@ -54,14 +94,208 @@ def get_cipher_instance():
 #   cipher = get_cipher_instance()
 #   return cipher.decrypt(base64.b64decode(enc_value.decode('hex'))).strip()
 
+
+class TokenCodec(object):
+  """
+    Converts ObjectId strings into opaque tokens and back.
+
+    AES ciphers are created once per thread instead of once per value and recently seen
+    values are kept in a bounded LRU memo. `encode_many` and `decode_many` convert a whole
+    column of ids with a single cipher call as ECB encrypts every block independently.
+  """
+  block_size = 32
+
+  def __init__(self, memo_size=4096):
+    self.memo_size = memo_size
+    self._local = local()
+    self._lock = Lock()
+    self._tokens = OrderedDict()
+    self._values = OrderedDict()
+    # secret the memo entries were made with
+    self._secret = SECRET
+
+  @property
+  def cipher(self):
+    # the cipher is rebuilt if the secret has been changed since it was cached
+    cached = getattr(self._local, 'cipher', None)
+    if cached is None or cached[0] != SECRET:
+      cached = self._local.cipher = (SECRET, get_cipher_instance())
+    return cached[1]
+
+  def _check_secret(self):
+    # tokens memoized with a previous secret are dropped, called with the lock held
+    if self._secret != SECRET:
+      self._secret = SECRET
+      self._tokens.clear()
+      self._values.clear()
+
+  def _memo_get(self, memo, key):
+    with self._lock:
+      self._check_secret()
+      value = memo.pop(key, None)
+      if value is not None:
+        memo[key] = value
+      return value
+
+  def _memo_set(self, memo, key, value):
+    if not self.memo_size:
+      return
+    with self._lock:
+      self._check_secret()
+      memo.pop(key, None)
+      memo[key] = value
+      while len(memo) > self.memo_size:
+        memo.popitem(last=False)
+
+  def _memo_get_many(self, memo, keys):
+    with self._lock:
+      self._check_secret()
+      found = []
+      for key in keys:
+        value = memo.pop(key, None)
+        if value is not None:
+          memo[key] = value
+        found.append(value)
+      return found
+
+  def clear(self):
+    with self._lock:
+      self._tokens.clear()
+      self._values.clear()
+
+  def _remember(self, value, token):
+    self._memo_set(self._tokens, value, token)
+    self._memo_set(self._values, token, value)
+
+  def _remember_many(self, pairs):
+    # a single lock for the whole column, only the last `memo_size` pairs can stay in the memo
+    if not self.memo_size:
+      return
+    with self._lock:
+      self._check_secret()
+      for value, token in pairs[-self.memo_size:]:
+        self._tokens.pop(value, None)
+        self._tokens[value] = token
+        self._values.pop(token, None)
+        self._values[token] = value
+      for memo in (self._tokens, self._values):
+        while len(memo) > self.memo_size:
+          memo.popitem(last=False)
+
+  @staticmethod
+  def _to_token(enc_value):
+    return str(binascii.hexlify(base64.b64encode(enc_value)), 'utf-8')
+
+  @staticmethod
+  def _from_token(token):
+    return base64.b64decode(binascii.unhexlify(token.encode('utf-8')))
+
+  def encode(self, value):
+    token = self._memo_get(self._tokens, value)
+    if token is None:
+      token = self._to_token(self.cipher.encrypt(to_bytes(value).rjust(self.block_size)))
+      self._remember(value, token)
+    return token
+
+  def decode(self, token):
+    value = self._memo_get(self._values, token)
+    if value is None:
+      value = str(self.cipher.decrypt(self._from_token(token)).strip(), 'utf-8')
+      self._remember(value, token)
+    return value
+
+  def encode_many(self, values):
+    """
+      Encodes a list of values. Values missing from the memo are encrypted in one pass.
+    """
+    tokens = self._memo_get_many(self._tokens, values)
+    pending = OrderedDict()
+    for index, value in enumerate(values):
+      if tokens[index] is None:
+        pending.setdefault(value, []).append(index)
+    if not pending:
+      return tokens
+
+    padded = [to_bytes(value).rjust(self.block_size) for value in pending]
+    if any(len(value) != self.block_size for value in padded):
+      # longer values do not line up with the blocks, encode them one by one
+      for value, indexes in list(pending.items()):
+        token = self.encode(value)
+        for index in indexes:
+          tokens[index] = token
+      return tokens
+
+    encrypted = self.cipher.encrypt(b''.join(padded))
+    pairs = []
+    for position, (value, indexes) in enumerate(pending.items()):
+      start = position * self.block_size
+      token = self._to_token(encrypted[start:start + self.block_size])
+      pairs.append((value, token))
+      for index in indexes:
+        tokens[index] = token
+    self._remember_many(pairs)
+    return tokens
+
+  def decode_many(self, tokens):
+    """
+      Decodes a list of tokens. Tokens missing from the memo are decrypted in one pass.
+    """
+    values = self._memo_get_many(self._values, tokens)
+    pending = OrderedDict()
+    for index, token in enumerate(tokens):
+      if values[index] is None:
+        pending.setdefault(token, []).append(index)
+    if not pending:
+      return values
+
+    raw_values = [self._from_token(token) for token in pending]
+    if any(len(raw_value) != self.block_size for raw_value in raw_values):
+      for token, indexes in list(pending.items()):
+        value = self.decode(token)
+        for index in indexes:
+          values[index] = value
+      return values
+
+    decrypted = self.cipher.decrypt(b''.join(raw_values))
+    pairs = []
+    for position, (token, indexes) in enumerate(pending.items()):
+      start = position * self.block_size
+      value = str(decrypted[start:start + self.block_size].strip(), 'utf-8')
+      pairs.append((value, token))
+      for index in indexes:
+        values[index] = value
+    self._remember_many(pairs)
+    return values
+
+
+codec = TokenCodec()
+
+
+TOKEN_REGEX = re.compile(r'^[0-9a-fA-F]{88}$')
+
+
+def is_token(value):
+  """
+    Cheap shape check which rejects values that can not be an encoded ObjectId
+    before doing any crypto work on them.
+  """
+  return isinstance(value, str) and TOKEN_REGEX.match(value) is not None
+
+
 def encode(value):
-  cipher = get_cipher_instance()
-  return str(binascii.hexlify(base64.b64encode(cipher.encrypt(value.rjust(32)))), 'utf-8')
+  return codec.encode(value)
 
 
 def decode(enc_value):
-  cipher = get_cipher_instance()
-  return str(cipher.decrypt(base64.b64decode(binascii.unhexlify(enc_value.encode('utf-8')))).strip(), 'utf-8')
+  return codec.decode(enc_value)
+
+
+def encode_many(values):
+  return codec.encode_many(values)
+
+
+def decode_many(enc_values):
+  return codec.decode_many(enc_values)
 
 
 def url(regex, api):
@@ -127,6 +361,38 @@ def datetime_to_millis(dt):
   return datetime_to_unix_timestamp(dt) * 1000
 
 
+def datetimes_to_millis(dts):
+  """
+    Batch version of `datetime_to_millis` for a column of aware datetimes.
+  """
+  return [(dt - epoch).total_seconds() * 1000 for dt in dts]
+
+
+def millis_to_datetimes(millis):
+  """
+    Batch version of `millis_since_epoch_to_datetime`. Uses numpy datetime64 arrays when numpy
+    is installed so only attaching the utc tzinfo is left per value.
+  """
+  if np is None or not len(millis):
+    return [millis_since_epoch_to_datetime(value) for value in millis]
+  values = np.asarray(millis)
+  if values.dtype.kind in 'iu':
+    # integers are truncated to seconds like `millis_since_epoch_to_datetime` does
+    values = (values // 1000 * 1000).astype('datetime64[ms]')
+  else:
+    values = np.rint(values * 1000).astype('int64').astype('datetime64[us]')
+  return [dt.replace(tzinfo=utc) for dt in values.astype(object)]
+
+
+def timestamps_to_datetimes(timestamps):
+  """
+    Batch version of `fromtimestamp`.
+  """
+  if np is None or not len(timestamps):
+    return [fromtimestamp(value) for value in timestamps]
+  return millis_to_datetimes(np.asarray(timestamps, dtype='float64') * 1000)
+
+
 def datetime_to_mins(dt):
   delta = dt - epoch
   return int(old_div(delta.total_seconds(), 60))
@@ -144,6 +410,73 @@ def parse_datetime_without_tz(string, fmt):
   return datetime_lib.datetime.strptime(string, fmt)
 
 
+ISO_DATETIME_REGEX = re.compile(
+    r'^(\d{4})-(\d{2})-(\d{2})'
+    r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:[.,](\d{1,6})\d*)?)?)?'
+    r'\s*(Z|[+-]\d{2}(?::?\d{2})?)?$', re.IGNORECASE)
+ISO_TIME_REGEX = re.compile(r'^(\d{2}):(\d{2})(?::(\d{2})(?:[.,](\d{1,6})\d*)?)?$')
+MILLIS_REGEX = re.compile(r'^-?\d{11,}$')
+# YYYYMMDDhhmm and YYYYMMDDhhmmss strings are compact datetimes, not epoch millis
+COMPACT_DATETIME_REGEX = re.compile(r'^\d{12}(?:\d{2})?$')
+
+
+def _iso_tzinfo(designator):
+  if not designator:
+    return None
+  if designator in ('Z', 'z'):
+    return utc
+  sign = -1 if designator[0] == '-' else 1
+  digits = designator[1:].replace(':', '')
+  minutes = int(digits[:2]) * 60 + int(digits[2:] or 0)
+  if not minutes:
+    return utc
+  return get_tzinfo(sign * minutes / 60.0)
+
+
+def _micros(fraction):
+  return int(fraction.ljust(6, '0')) if fraction else 0
+
+
+def parse_datetime_string(string):
+  """
+    Parses a datetime string. ISO-8601 strings and epoch millis are handled without
+    dateutil, which is only used as a fallback for other formats.
+  """
+  if isinstance(string, bytes):
+    string = string.decode('utf-8')
+  string = string.strip()
+  match = ISO_DATETIME_REGEX.match(string)
+  if match:
+    year, month, day, hour, minute, second, fraction, designator = match.groups()
+    value = datetime_lib.datetime(
+        int(year), int(month), int(day), int(hour or 0), int(minute or 0),
+        int(second or 0), _micros(fraction))
+    tzinfo = _iso_tzinfo(designator)
+    if tzinfo is None:
+      return value
+    if tzinfo is utc:
+      return value.replace(tzinfo=utc)
+    return tzinfo.localize(value)
+  if MILLIS_REGEX.match(string) and not COMPACT_DATETIME_REGEX.match(string):
+    return millis_since_epoch_to_datetime(int(string))
+  return dt_parser.parse(string)
+
+
+def parse_date_string(string):
+  return parse_datetime_string(string).date()
+
+
+def parse_time_string(string):
+  if isinstance(string, bytes):
+    string = string.decode('utf-8')
+  string = string.strip()
+  match = ISO_TIME_REGEX.match(string)
+  if match:
+    hour, minute, second, fraction = match.groups()
+    return datetime_lib.time(int(hour), int(minute), int(second or 0), _micros(fraction))
+  return dt_parser.parse(string).time()
+
+
 def parse_time_zone(tz_string):
   return pytz.timezone(tz_string)
 
@@ -187,14 +520,21 @@ def change_timezone(dt_object, time_zone):
   return dt_object
 
 
+TZINFO_CACHE = dict()
+
+
 def get_tzinfo(offset):
   """
-    Offset must be in hours
+    Offset must be in hours. Offsets and zone names are resolved once and cached.
   """
+  if offset in TZINFO_CACHE:
+    return TZINFO_CACHE[offset]
   try:
-    return pytz.FixedOffset(float(offset) * 60)
+    tzinfo = pytz.FixedOffset(float(offset) * 60)
   except:
-    return pytz.timezone(offset)
+    tzinfo = pytz.timezone(offset)
+  TZINFO_CACHE[offset] = tzinfo
+  return tzinfo
 
 
 def time(hour, minute):
@@ -225,10 +565,14 @@ def import_module(pkg):
   return module()
 
 
-def unicode_to_python_obj(obj):
+def unicode_to_python_obj(obj, token_keys=None):
   """
     Formats the gievn data into valid python objects.
+    If `token_keys` is given only the values of those keys are decoded as object ids,
+    otherwise every value is tried.
   """
+  if token_keys is not None:
+    return decode_tokens(obj, token_keys)
   if isinstance(obj, (list, tuple)):
     temp = []
     for obj in obj:
@@ -253,12 +597,47 @@ def unicode_to_python_obj(obj):
   return temp_dict
 
 
+def decode_tokens(obj, token_keys, holds_token=False):
+  """
+    Decodes object ids only under the keys declared in `token_keys`.
+  """
+  if isinstance(obj, dict):
+    return dict((key, decode_tokens(value, token_keys, key in token_keys))
+                for key, value in list(obj.items()))
+  if isinstance(obj, (list, tuple)):
+    return [decode_tokens(item, token_keys, holds_token) for item in obj]
+  if holds_token:
+    return decode_obj(obj)
+  return obj
+
+
+def decode_in_place(obj, token_keys=None, holds_token=False):
+  """
+    Same as `unicode_to_python_obj` for freshly parsed json, the object ids are decoded inside
+    the given dicts and lists instead of copying them.
+  """
+  if isinstance(obj, dict):
+    for key, value in list(obj.items()):
+      obj[key] = decode_in_place(value, token_keys, token_keys is None or key in token_keys)
+    return obj
+  if isinstance(obj, list):
+    for index, item in enumerate(obj):
+      obj[index] = decode_in_place(item, token_keys, holds_token)
+    return obj
+  if token_keys is None or holds_token:
+    return decode_obj(obj)
+  return obj
+
+
 def decode_obj(obj):
   # if isinstance(obj, str):
   #   obj = obj.encode('utf-8')
   # if isinstance(obj, str):
   #   obj = urllib.parse.unquote(obj.strip())
 
+  if not is_token(obj):
+    return obj
+
   # try to decode as bson object id if possible
   try:
     return ObjectId(decode(obj))
@@ -281,6 +660,8 @@ def format_response(resp):
   """
 
   if isinstance(resp, (list, tuple)):
+    if resp and all(isinstance(obj, ObjectId) for obj in resp):
+      return encode_many([str(obj) for obj in resp])
     temp = []
     for obj in resp:
       temp.append(format_response(obj))
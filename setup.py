@@ -133,6 +133,10 @@ setup(
     #     'dev': ['check-manifest'],
     #     'test': ['coverage'],
     # },
+    extras_require={
+        'numpy': ['numpy'],
+        'fast': ['orjson'],
+    },
 
     # If there are data files included in your packages that need to be
     # installed, specify them here.
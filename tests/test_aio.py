@@ -0,0 +1,111 @@
+"""
+  Created on Oct 18 2026
+"""
+import asyncio
+import json
+import time
+import unittest
+
+import cherrypy
+from cherrypy import _cprequest
+from cherrypy.lib import httputil
+
+from cherrypyrest import aio
+from cherrypyrest import rest_apis
+
+
+LATENCY = 0.05
+
+
+class Service(object):
+  pass
+
+
+class UserManager(aio.AsyncBaseManager):
+  collection_name = 'users'
+  backend = aio.AsyncMemoryBackend(latency=LATENCY)
+
+
+class AsyncPermission(object):
+
+  def __init__(self, api, *args, **kwargs):
+    self.api = api
+
+  async def has_permission(self):
+    await asyncio.sleep(0)
+    if self.api.kwargs.get('deny'):
+      raise Exception(403, 'Permission denied')
+    self.api.context.checked = True
+
+
+class UsersAPI(aio.AsyncGenericAPI, rest_apis.ListAPI):
+  service = Service
+  manager = UserManager()
+  permissions = [AsyncPermission]
+  pks = []
+
+  async def get_queryset(self, params):
+    return await asyncio.gather(*[self.manager.get_obj(pk) for pk in self.pks])
+
+
+class UserPageAPI(aio.AsyncGenericAPI, rest_apis.ListAPI):
+  service = Service
+  manager = UserManager()
+  paginate = True
+  sorting = ['n']
+
+
+def new_request(method='GET'):
+  request = _cprequest.Request(httputil.Host('127.0.0.1', 80), httputil.Host('127.0.0.1', 1111))
+  request.method = method
+  cherrypy.serving.load(request, _cprequest.Response())
+  return request
+
+
+class AsyncGenericAPITest(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    manager = UserManager()
+    UserManager.backend.drop()
+    UsersAPI.pks = [aio.run_coroutine(manager.insert({'n': index})) for index in range(10)]
+
+  @classmethod
+  def tearDownClass(cls):
+    aio.EVENT_LOOP.stop()
+
+  def call(self, api, **kwargs):
+    new_request()
+    return json.loads(api.default(**kwargs))
+
+  def test_call_handler_awaits_async_handler(self):
+    api = UsersAPI()
+    resp = self.call(api)
+    # the async permission ran with the context of the request
+    self.assertTrue(api.context.checked)
+    self.assertTrue(resp['success'])
+    self.assertEqual([user['n'] for user in resp['data']], list(range(10)))
+
+  def test_async_permission_denies(self):
+    with self.assertRaises(cherrypy.HTTPError) as raised:
+      self.call(UsersAPI(), deny='1')
+    self.assertEqual(raised.exception.status, 403)
+
+  def test_concurrent_get_obj(self):
+    started = time.time()
+    self.call(UsersAPI())
+    # ten lookups of LATENCY seconds each run concurrently on the event loop
+    self.assertLess(time.time() - started, LATENCY * 5)
+
+  def test_keyset_pagination_with_async_manager(self):
+    api = UserPageAPI()
+    resp = self.call(api, limit='4')
+    seen = [user['n'] for user in resp['data']]
+    while resp.get('next_cursor'):
+      resp = self.call(api, limit='4', cursor=resp['next_cursor'])
+      seen.extend(user['n'] for user in resp['data'])
+    self.assertEqual(seen, list(range(10)))
+
+
+if __name__ == '__main__':
+  unittest.main()
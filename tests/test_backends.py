@@ -0,0 +1,52 @@
+"""
+  Created on Oct 18 2026
+"""
+import unittest
+
+from cherrypyrest.backends import MemoryBackend
+
+
+class MemoryCollectionTest(unittest.TestCase):
+
+  def collections(self):
+    # the same queries must give the same results with and without indexes
+    for indexes in ([], ['a.b', 'x']):
+      collection = MemoryBackend({'items': indexes}).get_collection('items')
+      collection.insert_one({'_id': 1, 'a': {'b': 1}, 'l': [1]})
+      collection.insert_one({'_id': 2, 'a': {'b': 2}, 'x': 5})
+      collection.insert_one({'_id': 3})
+      yield collection
+
+  @staticmethod
+  def pks(cursor):
+    return [document['_id'] for document in cursor]
+
+  def test_dotted_fields(self):
+    for collection in self.collections():
+      self.assertEqual(self.pks(collection.find({'a.b': 1})), [1])
+      self.assertEqual(self.pks(collection.find({'a.b': {'$in': [2]}})), [2])
+      self.assertEqual(self.pks(collection.find({'x': None})), [1, 3])
+      collection.update_one({'_id': 1}, {'$set': {'a': {'b': 7}}})
+      self.assertEqual(self.pks(collection.find({'a.b': 7})), [1])
+      self.assertEqual(self.pks(collection.find({'a.b': 1})), [])
+      collection.delete_one({'_id': 1})
+      self.assertEqual(self.pks(collection.find({'a.b': 7})), [])
+
+  def test_documents_are_copied(self):
+    for collection in self.collections():
+      found = collection.find_one({'_id': 1})
+      found['l'].append('edit')
+      found['a']['b'] = 9
+      inserted = {'_id': 4, 'l': [1]}
+      collection.insert_one(inserted)
+      inserted['l'].append('edit')
+      value = {'b': 5}
+      collection.update_one({'_id': 2}, {'$set': {'a': value}})
+      value['b'] = 6
+      self.assertEqual(collection.find_one({'_id': 1}), {'_id': 1, 'a': {'b': 1}, 'l': [1]})
+      self.assertEqual(collection.find_one({'_id': 4}), {'_id': 4, 'l': [1]})
+      self.assertEqual(self.pks(collection.find({'a.b': 5})), [2])
+
+
+if __name__ == '__main__':
+  unittest.main()
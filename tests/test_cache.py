@@ -0,0 +1,92 @@
+"""
+  Created on Oct 18 2026
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from cherrypyrest import backends
+from cherrypyrest import managers
+from cherrypyrest.cache import ObjectCache
+from cherrypyrest.cache import SQLiteCacheBackend
+
+
+BACKEND = backends.MemoryBackend()
+
+
+class UserManager(managers.BaseManager):
+  collection_name = 'users'
+  backend = BACKEND
+
+
+class ActiveUserManager(managers.BaseManager):
+  collection_name = 'users'
+  backend = BACKEND
+
+  def _get_obj(self, pk):
+    return self.collection.find_one({'_id': pk, 'deleted': False})
+
+
+class ObjectCacheTest(unittest.TestCase):
+
+  def setUp(self):
+    BACKEND.drop()
+    self.pk = BACKEND.get_collection('users').insert_one({'deleted': False}).inserted_id
+
+  def delete(self):
+    BACKEND.get_collection('users').update_one({'_id': self.pk}, {'$set': {'deleted': True}})
+
+  def test_pk_lookups_are_cached(self):
+    manager = UserManager()
+    manager.cache = ObjectCache()
+    self.assertEqual(manager._get_objs([self.pk])[0]['deleted'], False)
+    self.delete()
+    # served from the cache until the write is forgotten
+    self.assertEqual(manager._get_objs([self.pk])[0]['deleted'], False)
+    self.assertEqual(manager.cache.stats()['hits'], 1)
+    manager.forget(self.pk)
+    self.assertEqual(manager._get_objs([self.pk])[0]['deleted'], True)
+
+  def test_scoped_get_obj_is_not_cached(self):
+    manager = ActiveUserManager()
+    manager.cache = ObjectCache()
+    self.assertIsNotNone(manager._get_obj(self.pk))
+    self.delete()
+    self.assertIsNone(manager._get_obj(self.pk))
+    self.assertEqual(len(manager.cache.backend), 0)
+
+
+class SQLiteCacheBackendTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, 'cache.db')
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def test_entries_are_shared_through_the_file(self):
+    writer = ObjectCache(backend=SQLiteCacheBackend(self.path))
+    reader = ObjectCache(backend=SQLiteCacheBackend(self.path))
+    writer.set('users', 1, {'_id': 1, 'tags': ['a']})
+    self.assertEqual(reader.get('users', 1), {'_id': 1, 'tags': ['a']})
+    # the pk type is part of the key
+    self.assertIsNone(reader.get('users', '1'))
+    writer.invalidate('users', 1)
+    self.assertIsNone(reader.get('users', 1))
+
+  def test_least_recently_used_entries_are_evicted(self):
+    cache = ObjectCache(backend=SQLiteCacheBackend(self.path, max_size=2))
+    cache.set('users', 1, {'_id': 1})
+    cache.set('users', 2, {'_id': 2})
+    cache.get('users', 1)
+    cache.set('users', 3, {'_id': 3})
+    self.assertIsNone(cache.get('users', 2))
+    self.assertEqual(cache.get('users', 1), {'_id': 1})
+    self.assertEqual(cache.stats()['evictions'], 1)
+    self.assertEqual(cache.stats()['size'], 2)
+
+
+if __name__ == '__main__':
+  unittest.main()
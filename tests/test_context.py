@@ -0,0 +1,154 @@
+"""
+  Created on Oct 18 2026
+"""
+import json
+import random
+import socket
+import threading
+import time
+import unittest
+
+import cherrypy
+from bson.objectid import ObjectId
+from future.moves.urllib.request import urlopen
+
+from cherrypyrest import context
+from cherrypyrest import loaders
+from cherrypyrest import rest_apis
+from cherrypyrest import utils
+
+
+THREADS = 30
+REQUESTS_PER_THREAD = 40
+
+
+class Service(object):
+  pass
+
+
+class ObjectPermission(object):
+
+  def __init__(self, api, *args, **kwargs):
+    self.api = api
+
+  def has_permission(self):
+    # gives the other worker threads a chance to run between setting and reading the state
+    time.sleep(random.random() * 0.002)
+    self.api.object = {'pk': str(self.api.pk)}
+
+
+class ObjectAPI(rest_apis.RetrieveAPI):
+  service = Service
+  permissions = [ObjectPermission]
+
+  def GET(self, *args, **kwargs):
+    time.sleep(random.random() * 0.002)
+    return {
+        'object': self.get_object(),
+        'pk': str(self.pk),
+        'args': list(self.args),
+        'q': self.kwargs.get('q'),
+    }
+
+
+class Root(object):
+  api = ObjectAPI()
+
+  @cherrypy.expose
+  def objects(self, *args, **kwargs):
+    return self.api.default(*args, **kwargs)
+
+
+def free_port():
+  sock = socket.socket()
+  sock.bind(('127.0.0.1', 0))
+  port = sock.getsockname()[1]
+  sock.close()
+  return port
+
+
+class RequestContextTest(unittest.TestCase):
+  """
+    A single api instance serves concurrent requests from the cherrypy worker threads, the
+    per request state (pk, args, kwargs, object) of every response must be its own.
+  """
+
+  @classmethod
+  def setUpClass(cls):
+    cls.port = free_port()
+    cherrypy.config.update({
+        'server.socket_host': '127.0.0.1',
+        'server.socket_port': cls.port,
+        'server.thread_pool': THREADS,
+        'log.screen': False,
+        'environment': 'production',
+    })
+    cherrypy.tree.mount(Root(), '/')
+    cherrypy.engine.start()
+    cherrypy.engine.wait(cherrypy.engine.states.STARTED)
+
+  @classmethod
+  def tearDownClass(cls):
+    cherrypy.engine.exit()
+
+  def get(self, token, q):
+    url = 'http://127.0.0.1:{}/objects/{}?q={}'.format(self.port, token, q)
+    return json.loads(urlopen(url).read())['data']
+
+  def test_concurrent_requests_keep_their_own_state(self):
+    mismatches = []
+    failures = []
+
+    def worker(thread):
+      try:
+        for index in range(REQUESTS_PER_THREAD):
+          pk = str(ObjectId())
+          token = utils.encode(pk)
+          q = '{}-{}'.format(thread, index)
+          data = self.get(token, q)
+          expected = {'object': {'pk': pk}, 'pk': pk, 'args': [token], 'q': q}
+          if data != expected:
+            mismatches.append((data, expected))
+      except Exception as ex:
+        failures.append(ex)
+
+    threads = [threading.Thread(target=worker, args=(thread,)) for thread in range(THREADS)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(failures, [])
+    self.assertEqual(mismatches, [])
+
+
+class ThreadStateTest(unittest.TestCase):
+  """
+    Outside of a request (scripts, background workers) every thread gets its own batch loader
+    and request context.
+  """
+
+  def test_state_is_per_thread_outside_requests(self):
+    found = []
+    barrier = threading.Barrier(3)
+
+    def worker():
+      loader = loaders.get_loader()
+      api_context = context.get_context()
+      # keeps the threads alive together so their state can not be reused
+      barrier.wait()
+      found.append((loader, api_context))
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(len(set(id(loader) for loader, _ in found)), 3)
+    self.assertEqual(len(set(id(api_context) for _, api_context in found)), 3)
+    # the calling thread keeps its own state across calls
+    self.assertIs(loaders.get_loader(), loaders.get_loader())
+    self.assertIs(context.get_context(), context.get_context())
+
+
+if __name__ == '__main__':
+  unittest.main()
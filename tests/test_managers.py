@@ -0,0 +1,49 @@
+"""
+  Created on Oct 18 2026
+"""
+import unittest
+
+from cherrypyrest import backends
+from cherrypyrest import fields as base_fields
+from cherrypyrest import managers
+from cherrypyrest import models
+
+
+BACKEND = backends.MemoryBackend()
+
+
+class UserManager(managers.BaseManager):
+  collection_name = 'users'
+  backend = BACKEND
+
+
+class User(models.Model):
+  fields = ['_id', 'name']
+  pk = base_fields.ObjectID()
+  name = base_fields.String()
+  manager = UserManager()
+
+
+class Admin(User):
+  pass
+
+
+class GetInstanceTest(unittest.TestCase):
+
+  def setUp(self):
+    BACKEND.drop()
+    self.pk = BACKEND.get_collection('users').insert_one({'name': 'a'}).inserted_id
+
+  def test_manager_without_get_obj_looks_the_pk_up(self):
+    user = User.manager.get_instance(self.pk)
+    self.assertEqual(user.name, 'a')
+    self.assertIsNone(User.manager.get_instance(self.pk.__class__()))
+
+  def test_objects_are_built_with_the_model_declaring_the_manager(self):
+    Admin()
+    self.assertIs(User.manager.model, User)
+    self.assertIs(type(User.manager.get_instance(self.pk)), User)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,58 @@
+"""
+  Created on Oct 18 2026
+"""
+import unittest
+
+from cherrypyrest import backends
+from cherrypyrest import fields as base_fields
+from cherrypyrest import managers
+from cherrypyrest import models
+
+
+BACKEND = backends.MemoryBackend()
+
+
+class ProfileManager(managers.BaseManager):
+  collection_name = 'profiles'
+  backend = BACKEND
+
+  def update(self, obj):
+    return self.collection.replace_one({'_id': obj.pk}, obj.db_repr())
+
+
+class Profile(models.Model):
+  fields = ['_id', 'name', 'bio']
+  pk = base_fields.ObjectID()
+  name = base_fields.String()
+  bio = base_fields.String(null=True)
+  manager = ProfileManager()
+
+
+class PartialProfile(Profile):
+  partial_updates = True
+  manager = ProfileManager()
+
+
+class PartialUpdateTest(unittest.TestCase):
+
+  def setUp(self):
+    BACKEND.drop()
+    self.pk = BACKEND.get_collection('profiles').insert_one({'name': 'a', 'bio': 'b'}).inserted_id
+
+  def clear_bio(self, model):
+    obj = model.manager.get_instance(self.pk)
+    obj.bio = None
+    obj.update()
+    return BACKEND.get_collection('profiles').find_one({'_id': self.pk})
+
+  def test_cleared_field_is_stored_as_null_like_a_full_update(self):
+    full = self.clear_bio(Profile)
+    BACKEND.get_collection('profiles').update_one({'_id': self.pk}, {'$set': {'bio': 'b'}})
+    partial = self.clear_bio(PartialProfile)
+    self.assertIn('bio', full)
+    self.assertIsNone(full['bio'])
+    self.assertEqual(partial, full)
+
+
+if __name__ == '__main__':
+  unittest.main()
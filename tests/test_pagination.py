@@ -0,0 +1,130 @@
+"""
+  Created on Oct 18 2026
+"""
+import json
+import random
+import unittest
+
+import cherrypy
+import mongomock
+from bson.objectid import ObjectId
+from cherrypy import _cprequest
+from cherrypy.lib import httputil
+
+from cherrypyrest import backends
+from cherrypyrest import managers
+from cherrypyrest import rest_apis
+from cherrypyrest.pagination import decode_cursor
+from cherrypyrest.pagination import encode_cursor
+from cherrypyrest.pagination import keyset_filter
+from cherrypyrest.pagination import normalize_sorting
+
+
+BACKEND = backends.MemoryBackend()
+
+
+class Service(object):
+  pass
+
+
+class ItemManager(managers.BaseManager):
+  collection_name = 'items'
+  backend = BACKEND
+
+
+class ItemsAPI(rest_apis.ListAPI):
+  service = Service
+  manager = ItemManager()
+  paginate = True
+  sorting = ['n']
+
+
+class VersionedItemsAPI(ItemsAPI):
+  version_field = 'version'
+
+
+def new_request(headers=None):
+  request = _cprequest.Request(httputil.Host('127.0.0.1', 80), httputil.Host('127.0.0.1', 1111))
+  request.method = 'GET'
+  request.headers = httputil.HeaderMap(headers or {})
+  cherrypy.serving.load(request, _cprequest.Response())
+  return request
+
+
+class ConditionalPageTest(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    BACKEND.drop()
+    BACKEND.get_collection('items').insert_many([{'n': index, 'version': 1} for index in range(10)])
+
+  def get(self, api, headers=None, **kwargs):
+    new_request(headers)
+    body = api.default(**kwargs)
+    return cherrypy.response.status, cherrypy.response.headers.get('ETag'), body
+
+  def assert_page_not_modified(self, api):
+    status, etag, body = self.get(api, limit='4')
+    self.assertTrue(json.loads(body)['next_cursor'])
+    # the same page has the same next_cursor, so the same etag
+    self.assertEqual(self.get(api, limit='4')[1], etag)
+    status, _, body = self.get(api, {'If-None-Match': etag}, limit='4')
+    self.assertEqual(status, 304)
+    self.assertEqual(body, b'')
+
+  def test_paginated_list_gets_not_modified(self):
+    self.assert_page_not_modified(ItemsAPI())
+
+  def test_paginated_list_with_version_field_gets_not_modified(self):
+    self.assert_page_not_modified(VersionedItemsAPI())
+
+
+def walk(collection, sort, limit):
+  cursor = None
+  seen = []
+  while True:
+    query = keyset_filter(decode_cursor(cursor, sort), sort) if cursor else {}
+    items = list(collection.find(query).sort(sort).limit(limit + 1))
+    seen.extend(item['_id'] for item in items[:limit])
+    if len(items) <= limit:
+      return seen
+    cursor = encode_cursor(items[limit - 1], sort)
+
+
+class KeysetNullTest(unittest.TestCase):
+  """
+    Walking the pages of a list sorted on fields holding nulls (or missing) returns every
+    document once, in the order of the full sorted query.
+  """
+
+  def random_documents(self, rand):
+    documents = []
+    for _ in range(15):
+      document = {'_id': ObjectId()}
+      for name in ('a', 'b'):
+        roll = rand.random()
+        if roll < 0.6:
+          document[name] = rand.randint(0, 3)
+        elif roll < 0.8:
+          document[name] = None
+      documents.append(document)
+    return documents
+
+  def test_page_walk_matches_the_sorted_query(self):
+    rand = random.Random(1)
+    for trial in range(20):
+      documents = self.random_documents(rand)
+      sort = normalize_sorting([rand.choice(['a', '-a']), rand.choice(['b', '-b'])])
+      collections = [
+          mongomock.MongoClient().get_database('test').get_collection('walk{}'.format(trial)),
+          backends.MemoryBackend().get_collection('walk'),
+      ]
+      for collection in collections:
+        collection.insert_many([dict(document) for document in documents])
+        expected = [document['_id'] for document in collection.find().sort(sort)]
+        for limit in (1, 2, 4):
+          self.assertEqual(walk(collection, sort, limit), expected, (collection, sort, limit))
+
+
+if __name__ == '__main__':
+  unittest.main()
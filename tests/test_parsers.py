@@ -0,0 +1,67 @@
+"""
+  Created on Oct 18 2026
+"""
+import json
+import random
+import unittest
+
+from cherrypyrest.parsers import iter_array_items
+
+
+def random_value(rand, depth=0):
+  roll = rand.random()
+  if depth > 3 or roll < 0.3:
+    return rand.choice([
+        1, -2.5e3, 0, True, False, None, 12345678901234, 'a"b\\c', u'é€\U0001f600\n', '',
+        ',]}{[',
+    ])
+  if roll < 0.65:
+    return [random_value(rand, depth + 1) for _ in range(rand.randint(0, 4))]
+  return dict(
+      (rand.choice(['k', u'é"', ']', ',']) + str(index), random_value(rand, depth + 1))
+      for index in range(rand.randint(0, 4))
+  )
+
+
+def random_chunks(rand, body):
+  chunks = []
+  start = 0
+  while start < len(body):
+    size = rand.randint(1, 7)
+    chunks.append(body[start:start + size])
+    start += size
+  return chunks
+
+
+class IterArrayItemsTest(unittest.TestCase):
+
+  def test_arrays_split_at_random_offsets(self):
+    rand = random.Random(3)
+    for _ in range(500):
+      items = [random_value(rand) for _ in range(rand.randint(0, 6))]
+      body = json.dumps(
+          items, ensure_ascii=rand.random() < 0.5, indent=rand.choice([None, 1])).encode('utf-8')
+      # chunks split multi byte characters, strings, escapes and numbers
+      self.assertEqual(list(iter_array_items(random_chunks(rand, body))), items, body)
+
+  def test_items_are_yielded_before_the_array_ends(self):
+    items = iter_array_items(iter([b'[{"a": 1}, ', b'{"b"']))
+    self.assertEqual(next(items), {'a': 1})
+    with self.assertRaises(ValueError):
+      next(items)
+
+  def test_whitespace_and_numbers_across_chunks(self):
+    self.assertEqual(list(iter_array_items([b' [ ] '])), [])
+    self.assertEqual(list(iter_array_items([b'[1', b'23', b']'])), [123])
+
+  def test_malformed_input(self):
+    rand = random.Random(5)
+    for body in [b'[1,]', b'[,1]', b'[1,,2]', b'[1 2]', b'{}', b'[1', b'[1] x', b'[{]', b'[}]',
+                 b'["a]', b'[1}', b' ', b'', b'[{"a":1}{"b":2}]']:
+      for chunks in ([body], random_chunks(rand, body)):
+        with self.assertRaises(ValueError, msg=body):
+          list(iter_array_items(chunks))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,67 @@
+"""
+  Created on Oct 18 2026
+"""
+import threading
+import unittest
+
+from cherrypyrest import backends
+from cherrypyrest import managers
+from cherrypyrest.pool import ClientPool
+from cherrypyrest.pool import PoolTimeout
+
+
+POOL = ClientPool(max_size=2, wait_timeout=1)
+
+
+class UserManager(managers.BaseManager):
+  collection_name = 'users'
+  backend = backends.MemoryBackend()
+  pool = POOL
+
+  def in_use(self):
+    self.client
+    return POOL.stats()['in_use']
+
+
+class ClientPoolTest(unittest.TestCase):
+
+  def test_worker_threads_hold_clients_only_during_calls(self):
+    seen = []
+    done = threading.Event()
+
+    def worker():
+      seen.append(UserManager().in_use())
+      # the thread stays alive after the call, its client must be back in the pool
+      done.wait()
+
+    threads = [threading.Thread(target=worker) for _ in range(POOL.max_size * 3)]
+    for thread in threads:
+      thread.start()
+    try:
+      for thread in threads:
+        thread.join(0.5)
+      self.assertEqual(len(seen), len(threads))
+      self.assertEqual(set(seen), {1})
+      self.assertEqual(POOL.stats()['in_use'], 0)
+    finally:
+      done.set()
+      for thread in threads:
+        thread.join()
+
+  def test_borrow_keeps_the_client_for_the_block(self):
+    with POOL.borrow() as client:
+      self.assertIs(POOL.acquire(), client)
+      self.assertEqual(POOL.stats()['in_use'], 1)
+    self.assertEqual(POOL.stats()['in_use'], 0)
+
+  def test_checkout_times_out_when_exhausted(self):
+    pool = ClientPool(max_size=1, wait_timeout=0.05)
+    client = pool.checkout()
+    with self.assertRaises(PoolTimeout):
+      pool.checkout()
+    pool.checkin(client)
+    self.assertIs(pool.checkout(), client)
+
+
+if __name__ == '__main__':
+  unittest.main()